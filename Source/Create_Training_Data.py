@@ -1,14 +1,20 @@
 
 from __main__ import vtk, qt, ctk, slicer
-import EditorLib
+from vtk.util.numpy_support import vtk_to_numpy
 
-import SimpleITK as sitk
-import sitkUtils
 import numpy as np
 import multiprocessing
-import timeit
+import concurrent.futures
+import functools
+import threading
+import time
 
 import os
+import re
+import string
+
+# Regular expression for splitting filenames into string and number chunks (used for sorting the files numerically)
+alphanum_regex = re.compile('([0-9]+)')
 
 
 #
@@ -16,7 +22,6 @@ import os
 #
 class Create_Training_Data:
     def __init__(self, parent):
-        import string
         parent.title = "Create PCA Kinematics Training Data"
         parent.categories = ["PCA-Kinematics"]
         parent.contributors = ["Brent Foster (University of California Davis)"]
@@ -78,11 +83,23 @@ class Create_Training_DataWidget:
         self.directory_path = []
         self.output_directory_path = []
 
+        # Labels found in the first image of the input folder (excluding the background)
+        self.image_labels = []
+
         # Font settings for the module
         self.font_type = "Arial"
         self.font_size = 12
 
+        # Time of the last update of the status bar
+        self.last_progress_time = 0
+
+        # Data stored separately for each worker thread (i.e. the ICP objects and cell locators)
+        self.thread_data = threading.local()
+
     def setup(self):
+        # Create the font once and use it for all of the widgets
+        self.font = qt.QFont(self.font_type, self.font_size)
+
         frame = qt.QFrame()
         frameLayout = qt.QFormLayout()
         frame.setLayout(frameLayout)
@@ -90,7 +107,7 @@ class Create_Training_DataWidget:
 
         # Choose directory button to choose the folder for saving the registered image 
         self.directoryButton = qt.QPushButton("Choose folder with the segmented images")
-        self.directoryButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.directoryButton.setFont(self.font)
         self.directoryButton.toolTip = "Choose a folder of .nii or .img/.hdr images of the segmented bones."
         frameLayout.addWidget(self.directoryButton)
         self.directoryButton.connect('clicked()', self.onDirectoryButtonClick)
@@ -98,7 +115,7 @@ class Create_Training_DataWidget:
 
         # Choose the Output folder button to choose the folder for saving the registered image 
         self.outputDirectoryButton = qt.QPushButton("Choose folder to save the output training data to")
-        self.outputDirectoryButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.outputDirectoryButton.setFont(self.font)
         self.outputDirectoryButton.toolTip = "Choose a folder to save the output"
         frameLayout.addWidget(self.outputDirectoryButton)
         self.outputDirectoryButton.connect('clicked()', self.onOutputDirectoryButtonClick)
@@ -106,7 +123,7 @@ class Create_Training_DataWidget:
 
         # ICP Registration Collapse button
         self.ICPCollapsibleButton = ctk.ctkCollapsibleButton()
-        self.ICPCollapsibleButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.ICPCollapsibleButton.setFont(self.font)
         self.ICPCollapsibleButton.text = "Iterative Closest Point Registration"
         self.ICPCollapsibleButton.collapsed = True # Default is to not show     
         frameLayout.addWidget(self.ICPCollapsibleButton) 
@@ -116,7 +133,7 @@ class Create_Training_DataWidget:
 
         # Slider for Maximum Iteration Number for ICP registration    
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("Maximum Iteration Number: ")
         self.label.setToolTip("Select the maximum iteration number for the ICP registration.")
         self.IterationSlider = ctk.ctkSliderWidget()
@@ -127,13 +144,11 @@ class Create_Training_DataWidget:
         self.IterationSlider.singleStep = 5
         self.IterationSlider.tickInterval = 1
         self.IterationSlider.decimals = 0
-        self.IterationSlider.connect('valueChanged(double)', self.onIterationSliderChange)
         self.ICPFormLayout.addRow(self.label, self.IterationSlider)        
-        self.IterationNumber = self.IterationSlider.value # Set default value
 
         # Slider for Number of Landmarks for ICP      
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("ICP Landmark Number: ")
         self.label.setToolTip("Select the number of landmarks per surface for the ICP registration.")
         self.LandmarkSlider = ctk.ctkSliderWidget()
@@ -144,13 +159,11 @@ class Create_Training_DataWidget:
         self.LandmarkSlider.singleStep = 10
         self.LandmarkSlider.tickInterval = 1
         self.LandmarkSlider.decimals = 0
-        self.LandmarkSlider.connect('valueChanged(double)', self.onLandmarkSliderChange)
         self.ICPFormLayout.addRow(self.label, self.LandmarkSlider)        
-        self.LandmarkNumber = self.LandmarkSlider.value # Set default value
 
         # Slider for Maximum RMS Error for ICP       
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("ICP Maximum RMS Error: ")
         self.label.setToolTip("Select the maximum root mean square (RMS) error for determining the ICP registration convergence.")
         self.RMS_Slider = ctk.ctkSliderWidget()
@@ -161,13 +174,26 @@ class Create_Training_DataWidget:
         self.RMS_Slider.singleStep = 0.01
         self.RMS_Slider.tickInterval = 0.001
         self.RMS_Slider.decimals = 3
-        self.RMS_Slider.connect('valueChanged(double)', self.onRMS_SliderChange)
         self.ICPFormLayout.addRow(self.label, self.RMS_Slider)
-        self.RMS_Number = self.RMS_Slider.value # Set default value
+
+        # Slider for the voxel size for downsampling the surfaces before ICP       
+        self.label = qt.QLabel()
+        self.label.setFont(self.font)
+        self.label.setText("ICP Voxel Size: ")
+        self.label.setToolTip("Select the voxel size (in mm) for downsampling the surfaces before the ICP registration. The resulting transform is still applied to the full resolution surfaces. Larger values are faster but less accurate. Value of 0 does not downsample.")
+        self.ICP_Voxel_Slider = ctk.ctkSliderWidget()
+        self.ICP_Voxel_Slider.setToolTip("Select the voxel size (in mm) for downsampling the surfaces before the ICP registration. The resulting transform is still applied to the full resolution surfaces. Larger values are faster but less accurate. Value of 0 does not downsample.")
+        self.ICP_Voxel_Slider.minimum = 0
+        self.ICP_Voxel_Slider.maximum = 5
+        self.ICP_Voxel_Slider.value = 0
+        self.ICP_Voxel_Slider.singleStep = 0.1
+        self.ICP_Voxel_Slider.tickInterval = 0.1
+        self.ICP_Voxel_Slider.decimals = 2
+        self.ICPFormLayout.addRow(self.label, self.ICP_Voxel_Slider)
         
         # Slider for choosing the reference bone      
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("Reference Bone Label: ")
         self.label.setToolTip("Select the label of the bone to keep static. This bone will be registered among all the volunteers. Note: Please choose the folder with the segmented images first.")
         self.Ref_Bone_Slider = ctk.ctkSliderWidget()
@@ -178,40 +204,38 @@ class Create_Training_DataWidget:
         self.Ref_Bone_Slider.singleStep = 1
         self.Ref_Bone_Slider.tickInterval = 1
         self.Ref_Bone_Slider.decimals = 0
-        self.Ref_Bone_Slider.connect('valueChanged(double)', self.onRef_Bone_SliderChange)
         self.ICPFormLayout.addRow(self.label, self.Ref_Bone_Slider)        
-        self.ref_label = int(self.Ref_Bone_Slider.value) # Set default value
 
         # Radial buttons for the ICP parameters
         self.radial_button_1 = qt.QRadioButton("Similarity")
-        self.radial_button_1.setFont(qt.QFont(self.font_type, self.font_size))
-        self.radial_button_1.toggled.connect(self.onICPModeSelect_1)
+        self.radial_button_1.setFont(self.font)
+        self.radial_button_1.toggled.connect(lambda checked: self.onICPModeSelect('Similarity', checked))
         self.ICPFormLayout.addWidget(self.radial_button_1)
 
         self.radial_button_2 = qt.QRadioButton("Rigid")
-        self.radial_button_2.setFont(qt.QFont(self.font_type, self.font_size))
+        self.radial_button_2.setFont(self.font)
         self.radial_button_2.setChecked(True)
-        self.radial_button_2.toggled.connect(self.onICPModeSelect_2)
+        self.radial_button_2.toggled.connect(lambda checked: self.onICPModeSelect('Rigid', checked))
         self.ICPFormLayout.addWidget(self.radial_button_2)
 
         self.radial_button_3 = qt.QRadioButton("Affine")
-        self.radial_button_3.toggled.connect(self.onICPModeSelect_3)
+        self.radial_button_3.toggled.connect(lambda checked: self.onICPModeSelect('Affine', checked))
         self.ICPFormLayout.addWidget(self.radial_button_3)
 
         # Text input for choosing which image labels to use      
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("Image Labels: ")
         self.label.setToolTip("Choose several labels to use for creating the training data. Value of -1 uses the default 1 through 9. Otherwise, input should be similar to '1,2,3' to use labels one, two, and three. ")
         self.lineedit = qt.QLineEdit()
-        self.lineedit.setFont(qt.QFont(self.font_type, self.font_size))
+        self.lineedit.setFont(self.font)
         self.lineedit.setToolTip("Choose several labels to use for creating the training data. Value of -1 uses the default 1 through 9. Otherwise, input should be similar to '1,2,3' to use labels one, two, and three. ")
         self.ICPFormLayout.addRow(self.label, self.lineedit)
         self.lineedit.setText("-1")
 
         # Bone Smoothing Parameters Collapse Button
         self.SmoothCollapsibleButton = ctk.ctkCollapsibleButton()
-        self.SmoothCollapsibleButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.SmoothCollapsibleButton.setFont(self.font)
         self.SmoothCollapsibleButton.text = "Smoothing Options"
         self.SmoothCollapsibleButton.collapsed = True # Default is to not show  
         frameLayout.addWidget(self.SmoothCollapsibleButton) 
@@ -221,7 +245,7 @@ class Create_Training_DataWidget:
 
         # Slider for choosing the number of iterations for bone smoothing     
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("Smoothing Iterations: ")
         self.label.setToolTip("Select the number of iterations for smoothing the bone surface. Higher iterations will smooth more. Lower iterations will have less smoothing.")
         self.Bone_Smoothing_Its_Slider = ctk.ctkSliderWidget()
@@ -232,13 +256,11 @@ class Create_Training_DataWidget:
         self.Bone_Smoothing_Its_Slider.singleStep = 1
         self.Bone_Smoothing_Its_Slider.tickInterval = 1
         self.Bone_Smoothing_Its_Slider.decimals = 0
-        self.Bone_Smoothing_Its_Slider.connect('valueChanged(double)', self.onBone_Smoothing_Its_SliderChange)
         self.SmoothFormLayout.addRow(self.label, self.Bone_Smoothing_Its_Slider)
-        self.smoothing_iterations = self.Bone_Smoothing_Its_Slider.value # Set default value
         
         # Slider for choosing the smoothing relaxation factor     
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("Relaxation Factor: ")
         self.label.setToolTip("Select the relaxation factor for smoothing the bone surfaces. Higher relaxation will smooth the surface more while a lower factor will have less smoothing.")
         self.Bone_Smoothing_Relaxation_Slider = ctk.ctkSliderWidget()
@@ -249,13 +271,11 @@ class Create_Training_DataWidget:
         self.Bone_Smoothing_Relaxation_Slider.singleStep = 0.1
         self.Bone_Smoothing_Relaxation_Slider.tickInterval = 0.1
         self.Bone_Smoothing_Relaxation_Slider.decimals = 2
-        self.Bone_Smoothing_Relaxation_Slider.connect('valueChanged(double)', self.onBone_Smoothing_Relaxation_SliderChange)
         self.SmoothFormLayout.addRow(self.label, self.Bone_Smoothing_Relaxation_Slider)
-        self.relaxation_factor = self.Bone_Smoothing_Relaxation_Slider.value # Set default value
 
         # Slider for choosing the percentage of bone surface decimation    
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("Surface Decimation: ")
         self.label.setToolTip("Select the ratio of verticies to remove from the bone surface. This results in a smoother surface and less points for faster computation. Too much could cause surface artifacts. For example, 0.1 removes 10 percent while 0.9 removes 90 percent of points.")
         self.Bone_Decimate_Slider = ctk.ctkSliderWidget()
@@ -266,13 +286,11 @@ class Create_Training_DataWidget:
         self.Bone_Decimate_Slider.singleStep = 0.05
         self.Bone_Decimate_Slider.tickInterval = 0.05
         self.Bone_Decimate_Slider.decimals = 2
-        self.Bone_Decimate_Slider.connect('valueChanged(double)', self.onBone_Decimate_SliderChange)
         self.SmoothFormLayout.addRow(self.label, self.Bone_Decimate_Slider)        
-        self.decimate_surface = self.Bone_Decimate_Slider.value # Set default value    
 
         # Debugging Collapse button
         self.RenderingCollapsibleButton = ctk.ctkCollapsibleButton()
-        self.RenderingCollapsibleButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.RenderingCollapsibleButton.setFont(self.font)
         self.RenderingCollapsibleButton.text = "Visualization"
         self.RenderingCollapsibleButton.collapsed = True # Default is to not show   
         frameLayout.addWidget(self.RenderingCollapsibleButton) 
@@ -282,21 +300,21 @@ class Create_Training_DataWidget:
 
         # Show the registered shapes toggle button
         self.show_registered_shapes = qt.QCheckBox("Show Registered Shapes")
-        self.show_registered_shapes.setFont(qt.QFont(self.font_type, self.font_size))
+        self.show_registered_shapes.setFont(self.font)
         self.show_registered_shapes.toolTip = "When checked, show each registered bone. Useful for debugging any ICP registration based errors."
         self.show_registered_shapes.checked = False
         self.CollapseFormLayout.addWidget(self.show_registered_shapes) 
 
         # Show the registered shapes toggle button
         self.show_extracted_shapes = qt.QCheckBox("Show Extracted Shapes")
-        self.show_extracted_shapes.setFont(qt.QFont(self.font_type, self.font_size))
+        self.show_extracted_shapes.setFont(self.font)
         self.show_extracted_shapes.toolTip = "When checked, show the initial surfaces from the images. Useful for debugging errors based on deriving surfaces from the MR images."
         self.show_extracted_shapes.checked = False
         self.CollapseFormLayout.addWidget(self.show_extracted_shapes) 
 
         # Show the loaded images toggle button
         self.debug_show_images = qt.QCheckBox("Show Loaded Images")
-        self.debug_show_images.setFont(qt.QFont(self.font_type, self.font_size))
+        self.debug_show_images.setFont(self.font)
         self.debug_show_images.toolTip = "When checked, show the loaded images. Useful for debugging if the images are flipped or loading incorrectly."
         self.debug_show_images.checked = False
         self.CollapseFormLayout.addWidget(self.debug_show_images) 
@@ -304,7 +322,7 @@ class Create_Training_DataWidget:
 
         # Debugging Collapse button
         self.DebugCollapsibleButton = ctk.ctkCollapsibleButton()
-        self.DebugCollapsibleButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.DebugCollapsibleButton.setFont(self.font)
         self.DebugCollapsibleButton.text = "Debugging"
         self.DebugCollapsibleButton.collapsed = True # Default is to not show   
         frameLayout.addWidget(self.DebugCollapsibleButton) 
@@ -316,49 +334,49 @@ class Create_Training_DataWidget:
 
         # Show the flip image vertically toggle button
         self.flip_image_vertically = qt.QCheckBox("Flip Vertically")
-        self.flip_image_vertically.setFont(qt.QFont(self.font_type, self.font_size))
+        self.flip_image_vertically.setFont(self.font)
         self.flip_image_vertically.toolTip = "When checked, flip the images vertically after loading them."
         self.flip_image_vertically.checked = False
         self.CollapseFormLayout.addWidget(self.flip_image_vertically) 
 
         # Show the flip image horizontally toggle button
         self.flip_image_horizontally = qt.QCheckBox("Flip Horizontally")
-        self.flip_image_horizontally.setFont(qt.QFont(self.font_type, self.font_size))
+        self.flip_image_horizontally.setFont(self.font)
         self.flip_image_horizontally.toolTip = "When checked, flip the images horizontally after loading them."
         self.flip_image_horizontally.checked = False
         self.CollapseFormLayout.addWidget(self.flip_image_horizontally) 
 
         # Show the save bones separately toggle button
         self.Save_Extracted_Bones_Separately = qt.QCheckBox("Save Extracted Bones Separately")
-        self.Save_Extracted_Bones_Separately.setFont(qt.QFont(self.font_type, self.font_size))
+        self.Save_Extracted_Bones_Separately.setFont(self.font)
         self.Save_Extracted_Bones_Separately.toolTip = "When checked, save each bone surface separately after smoothing and before any registration."
         self.Save_Extracted_Bones_Separately.checked = False
         self.CollapseFormLayout.addWidget(self.Save_Extracted_Bones_Separately) 
 
         # Show the save bones separately toggle button
         self.Save_Registered_Bones_Separately = qt.QCheckBox("Save Registered Bones Separately")
-        self.Save_Registered_Bones_Separately.setFont(qt.QFont(self.font_type, self.font_size))
+        self.Save_Registered_Bones_Separately.setFont(self.font)
         self.Save_Registered_Bones_Separately.toolTip = "When checked, save each bone surface separately after smoothing and registration (instead of combining all the bones for each volunteer/position together)."
         self.Save_Registered_Bones_Separately.checked = False
         self.CollapseFormLayout.addWidget(self.Save_Registered_Bones_Separately) 
 
         # Skip the registration
         self.Skip_Registration = qt.QCheckBox("Skip Registration Steps")
-        self.Skip_Registration.setFont(qt.QFont(self.font_type, self.font_size))
+        self.Skip_Registration.setFont(self.font)
         self.Skip_Registration.toolTip = "When checked, extract each bone surface from the image and smooth the surface (this is useful if the user only wishes to extract the bones from the images and smooth them.) Consider using along with the save extracted bones setting."
         self.Skip_Registration.checked = False
         self.CollapseFormLayout.addWidget(self.Skip_Registration) 
 
         # Don't save the reference bone toggle button
         self.Remove_Ref_Bone = qt.QCheckBox("Remove the reference bone")
-        self.Remove_Ref_Bone.setFont(qt.QFont(self.font_type, self.font_size))
+        self.Remove_Ref_Bone.setFont(self.font)
         self.Remove_Ref_Bone.toolTip = "When checked, don't save the refernce bone when saving the PLY file. For example, this is useful if using the radius as a reference bone, but if you don't want it to appear in the final model."
         self.Remove_Ref_Bone.checked = False
         self.CollapseFormLayout.addWidget(self.Remove_Ref_Bone) 
 
         # Choose the number of files to load from the given folder     
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("Number of images: ")
         self.label.setToolTip("Select how many images to use from the given folder. (Select the folder first). This is useful if want want to use just the first few images to make sure everything runs correctly.")
         self.NumFileSlider = ctk.ctkSliderWidget()
@@ -369,13 +387,11 @@ class Create_Training_DataWidget:
         self.NumFileSlider.singleStep = 1
         self.NumFileSlider.tickInterval = 1
         self.NumFileSlider.decimals = 0
-        self.NumFileSlider.connect('valueChanged(double)', self.onNumSliderChange)
         self.CollapseFormLayout.addRow(self.label, self.NumFileSlider)        
-        self.num_files = self.NumFileSlider.value # Set default value
 
         # Compute button
         self.computeButton = qt.QPushButton("Create The Training Data")
-        self.computeButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.computeButton.setFont(self.font)
         self.computeButton.toolTip = "Run the module and create the training data for the PCA bone displacement model."
         frameLayout.addWidget(self.computeButton)
         self.computeButton.connect('clicked()', self.onCompute)
@@ -383,7 +399,7 @@ class Create_Training_DataWidget:
 
         # Progress Bar (so the user knows how much longer it will take)
         self.progressBar = qt.QProgressBar()
-        self.progressBar.setFont(qt.QFont(self.font_type, self.font_size))
+        self.progressBar.setFont(self.font)
         self.progressBar.setValue(0)
         frameLayout.addWidget(self.progressBar)
         self.progressBar.hide()
@@ -401,57 +417,10 @@ class Create_Training_DataWidget:
         # Update the compute button state (to determine if it should be enabled or not)
         self.UpdatecomputeButtonState()
 
-    def onBone_Decimate_SliderChange(self, newValue):
-        # Percentage to decimate the bone surface by
-        # This results in a smoother surface and less points for faster computation
-        # Although too much could cause surface artifacts
-
-        self.decimate_surface = newValue
-        
-    def onBone_Smoothing_Its_SliderChange(self, newValue):
-        # Number of iterations for bone surface smoothing
-        self.smoothing_iterations = newValue
-
-    def onBone_Smoothing_Relaxation_SliderChange(self, newValue):
-        # Relaxation factor for bone surface smoothing
-        self.relaxation_factor = newValue
-
-    def onRef_Bone_SliderChange(self, newValue):
-        # The label of the segmented image to consider as a reference bone
-        # This bone is held statically between all volunteers by ICP registration
-        self.ref_label = int(newValue)
-
-    def onICPModeSelect_1(self,newValue):
-        # Set the mode for ICP registration
-        if newValue == True:
-            self.icp_mode = 'Similarity' 
-            print(self.icp_mode)
-
-    def onICPModeSelect_2(self,newValue):
-        # Set the mode for ICP registration
-        if newValue == True:
-            self.icp_mode = 'Rigid' 
-            print(self.icp_mode)
-
-    def onICPModeSelect_3(self,newValue):
-        # Set the mode for ICP registration
-        if newValue == True:
-            self.icp_mode = 'Affine' 
-            print(self.icp_mode)
-
-    def onRMS_SliderChange(self, newValue):
-        self.RMS_Number = newValue
-
-    def onLandmarkSliderChange(self, newValue):
-        self.LandmarkNumber = newValue        
-
-    def onIterationSliderChange(self, newValue):
-        self.IterationNumber = newValue
-
-    def onNumSliderChange(self, value):
-        # Slider for selecting the number of images to use
-        # For debugging or if the model generation is too slow
-        self.num_files = value
+    def onICPModeSelect(self, mode, checked):
+        # Set the mode for ICP registration ('Similarity', 'Rigid', or 'Affine')
+        if checked == True:
+            self.icp_mode = mode
 
     def onDirectoryButtonClick(self):
         # After clicking the button, let the user choose a directory for saving
@@ -463,23 +432,52 @@ class Create_Training_DataWidget:
         except:
             self.directoryButton.setText('Segmentations: ' + self.directory_path) # Show the entire path if it is less than 35 characters long
 
+        # Find all the image files in the input folder (in a single pass over the folder)
+        # Only the nifti (.nii) files are loaded in onCompute so ignore any other files
+        with os.scandir(self.directory_path) as entries:
+            self.files = [entry.name for entry in entries if entry.is_file() and entry.name.endswith('.nii')]
+
+        # Provide a popup error so the user knows that the folder doesn't have any images
+        if len(self.files) == 0:
+            msg = qt.QMessageBox()
+            msg.setIcon(qt.QMessageBox.Information)
+            msg.setText('The selected folder does not contain any nifti (.nii) images.')
+            msg.setInformativeText("Click on the Choose folder with the segmented images button to select another folder.")
+            msg.setWindowTitle("Create PCA Kinematics Training Data - Error")
+            msg.exec_()
+
+            # Don't allow computing with this folder
+            self.directory_path = []
+            self.UpdatecomputeButtonState()
+
+            return
+
+        # Sort the files to be in numerical order
+        self.files.sort(key=self.alphanum_key)
+
         # Update the slider for selecting the number of files to use (for debugging)
-        self.NumFileSlider.maximum = len(os.listdir(self.directory_path)) 
+        self.NumFileSlider.maximum = len(self.files) 
 
         # Update the "Reference Bone Label" slider (i.e. self.Ref_Bone_Slider) to have a maximum value 
         # Based on the maximum value of the first image loaded
 
-        # Find all the files in the input folder
-        self.files = os.listdir(self.directory_path)
-
         # Use the first file in the folder
-        imgReader = self.load_image(str(self.directory_path + '\\' + self.files[0]))
+        # SimpleITK is only imported when needed (it is slow to import and not needed to open the module)
+        import SimpleITK as sitk
+        image = sitk.ReadImage(str(os.path.join(self.directory_path, self.files[0])))
+
+        # Get the range of the labels using the (multi-threaded) SimpleITK minimum/maximum filter
+        min_max_filter = sitk.MinimumMaximumImageFilter()
+        min_max_filter.Execute(image)
+        min_label = int(min_max_filter.GetMinimum())
+        max_label = int(min_max_filter.GetMaximum())
+
+        # Save the labels in the range (except the background) to use as the default bone labels
+        self.image_labels = np.arange(min_label + 1, max_label + 1)
 
-        from vtk.util.numpy_support import vtk_to_numpy
-        array = vtk_to_numpy(imgReader.GetOutput().GetPointData().GetScalars())
-        self.Ref_Bone_Slider.minimum = np.amin(array) + 1 # Assume the lowest value is the background label
-        self.Ref_Bone_Slider.maximum  = np.amax(array)
-        self.Ref_Bone_Slider.value = np.amax(array) - 1 # Default should be 9 (the radius bone)
+        self.Ref_Bone_Slider.minimum = min_label + 1 # Assume the lowest value is the background label
+        self.Ref_Bone_Slider.maximum  = max_label
+        self.Ref_Bone_Slider.value = max_label - 1 # Default should be 9 (the radius bone)
 
         # Update the compute button state (to determine if it should be enabled or not)
         self.UpdatecomputeButtonState()
@@ -495,157 +493,170 @@ class Create_Training_DataWidget:
         else:
             self.computeButton.enabled = False
 
-    def tryint(self, s):
-        # Used with alphanum_key() function to sort the files numerically
-        try:
-            return int(s)
-        except:
-            return s
-
     def alphanum_key(self, s):
         # For sorting of the filenames to be in numerical order 
         # Turn a string into a list of string and number chunks "z23a" -> ["z", 23, "a"]
-        import re
-
-        return [ self.tryint(c) for c in re.split('([0-9]+)', s) ]
+        return [ int(c) if c.isdigit() else c for c in alphanum_regex.split(s) ]
 
 
     def onCompute(self):
         slicer.app.processEvents()
 
-        import time
         # Show the status bar
         self.progressBar.show()
 
-        # Initilize various parameters
-        self.bone_labels = np.fromstring(self.lineedit.text, dtype=int, sep=',')
+        # Get the current values of the sliders
+        self.IterationNumber = int(self.IterationSlider.value)
+        self.LandmarkNumber = int(self.LandmarkSlider.value)
+        self.RMS_Number = self.RMS_Slider.value
+        self.icp_voxel_size = self.ICP_Voxel_Slider.value
+        self.ref_label = int(self.Ref_Bone_Slider.value)
+        self.smoothing_iterations = int(self.Bone_Smoothing_Its_Slider.value)
+        self.relaxation_factor = self.Bone_Smoothing_Relaxation_Slider.value
+        self.decimate_surface = self.Bone_Decimate_Slider.value
+        self.num_files = int(self.NumFileSlider.value)
 
-        # Check to see if self.bone_labels is set to negative on and if so set to the default labels
-        if self.bone_labels[0] == -1:
-            # Use the minimum and maximum of the Ref_Bone_Slider (which is based on the minimum and maximum label in the first image)
-            self.bone_labels = range(int(self.Ref_Bone_Slider.minimum), int(self.Ref_Bone_Slider.maximum)+1)      
+        # Initilize various parameters
+        labels_text = self.lineedit.text.strip()
 
-        self.max_bone_label = np.max(self.bone_labels)
+        # Check to see if the bone labels are set to negative one and if so set to the default labels
+        if labels_text == '-1':
+            # Use the labels found in the first image (excluding the background label)
+            self.bone_labels = tuple(int(label) for label in self.image_labels)
+        else:
+            # Skip any empty labels (e.g. "1,2," or "1, ,2")
+            labels = [label.strip() for label in labels_text.split(',') if label.strip() != '']
+
+            # Provide a popup error so the user knows that the bone labels need to be positive integers
+            # Only plain digits are accepted (so int() can't fail) and the background label 0 isn't a bone
+            if len(labels) == 0 or not all(re.fullmatch('[0-9]+', label) and int(label) > 0 for label in labels):
+                msg = qt.QMessageBox()
+                msg.setIcon(qt.QMessageBox.Information)
+                msg.setText('The bone labels must be a comma separated list of positive integers (e.g. 1,2,3).')
+                msg.setInformativeText("Enter the bone labels to use or -1 to use all the labels in the first image.")
+                msg.setWindowTitle("Create PCA Kinematics Training Data - Error")
+                msg.exec_()
+
+                self.progressBar.hide()
+                return
+
+            self.bone_labels = tuple(int(label) for label in labels)
         
-        # Find all the files in the input folder
-        self.files = os.listdir(self.directory_path)
-
-        # Sort the files to be in order now
-        self.files.sort(key=self.alphanum_key)
-
+        # The (sorted) image files in the input folder were found in onDirectoryButtonClick
         if self.num_files > len(self.files):
             self.num_files = len(self.files)
 
         # Initilize a list of file indicies
         if self.num_files == -1:
-            self.file_list = range(0, len(self.files))
+            self.file_list = range(len(self.files))
         else:
-            self.file_list = range(0, int(self.num_files))
+            self.file_list = range(self.num_files)
 
-        # Initilize Python list to hold all of the polydata
-        # One index for each bone label (ranges from 1 to 9)
-        polydata_list = []
-
-        for i in range(0,self.max_bone_label+1):
-            polydata_list.append([])
+        # Initilize Python dictionary to hold all of the polydata
+        # One list for each bone label (only the labels being used)
+        polydata_list = {label: [] for label in self.bone_labels}
 
         # Load all of the images from the input folder
+        # self.files only has the nifti (.nii) files (see onDirectoryButtonClick)
+        load_files = list(self.file_list)
+        filenames = [os.path.join(self.directory_path, self.files[curr_file]) for curr_file in load_files]
+
+        # Each image is independent so load (and flip) them using a pool of worker threads
+        # Threads are used instead of processes since the VTK objects can not be pickled and VTK releases the GIL while reading and filtering
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=multiprocessing.cpu_count())
+
+        # Read the flip checkboxes here on the main thread (the Qt widgets shouldn't be used from the worker threads)
+        # The voxels are stored with x changing fastest so the numpy axes are (z, y, x)
+        flip_axes = []
+
+        # It's upside-down when loaded, so flip the y axis
+        if self.flip_image_vertically.checked == True:                    
+            flip_axes.append(1)
+
+        # If the images are flipped left/right so flip the x axis
+        if self.flip_image_horizontally.checked == True:                   
+            flip_axes.append(2)
+
         images_list = []
+        slicer.util.showStatusMessage("Loading Images...")
 
-        for curr_file in self.file_list:
+        # Use map so the images are returned in the same order as the files
+        for index, image in enumerate(executor.map(functools.partial(self.Load_Image_File, flip_axes=flip_axes), filenames)):
 
             # Update the status bar
-            self.progressBar.setValue(float(curr_file)/len(self.file_list)*100/10) # Use 10% of the status bar for loading the images
-            slicer.app.processEvents()
-            slicer.util.showStatusMessage("Loading Images...")
-
-            if self.files[curr_file][-3:] == 'nii':
-                print(str('Running file number ' + str(curr_file)))
-
-                # Load the nifti (.nii) or analyze image (.img/.hdr) using SimpleITK               
-                filename = os.path.join(self.directory_path, self.files[curr_file])
-                image = self.load_image(filename)
-
-                # It's upside-down when loaded, so add a flip filter
-                if self.flip_image_vertically.checked == True:                    
-                    imflip = vtk.vtkImageFlip()
-                    try:
-                        imflip.SetInputData(image.GetOutput())
-                    except:
-                        imflip.SetInputData(image)
-                    imflip.SetFilteredAxis(1)
-                    imflip.Update()
-                    image = imflip.GetOutput()
-
-                # If the images are flipped left/right so use a flip filter
-                if self.flip_image_horizontally.checked == True:                   
-                    imflip = vtk.vtkImageFlip()
-                    try:
-                        imflip.SetInputData(image.GetOutput())
-                    except:
-                        imflip.SetInputData(image)
-                    imflip.SetFilteredAxis(0)
-                    imflip.Update()
-                    image = imflip.GetOutput()
-
-                # Append the loaded image to the images_list
-                images_list.append(image)
-
-                # Temporarily push the image to Slicer (to have the correct class type for the model maker Slicer module)
-                if self.debug_show_images.checked == True:                    
-                    image = sitk.ReadImage(filename)
-                    sitkUtils.PushToSlicer(image, str(curr_file), 0, overwrite=True)
-                    node = slicer.util.getNode(str(curr_file))
-
-        # If there is a non .nii file in the folder the images_list will be shorter than file_list
-        # Redefine the file_list here
-        self.file_list = range(0, len(images_list))
-
-        iter = 0 # For status bar
-
-        # Extract the surface from each image (i.e. the polydata)
-        for label in self.bone_labels: 
+            self.Update_Progress(float(index+1)/len(load_files)*100/10, force=(index+1 == len(load_files))) # Use 10% of the status bar for loading the images
+
+            print(str('Loaded file number ' + str(load_files[index])))
+
+            # Append the loaded image to the images_list
+            images_list.append(image)
+
+            # Temporarily push the image to Slicer (to have the correct class type for the model maker Slicer module)
+            # Use the image already loaded (and flipped) instead of reading the file again
+            if self.debug_show_images.checked == True:                    
+                self.Show_Image(image, str(load_files[index]))
+
+        # Extract the surface of each bone label from each image (i.e. the polydata) using the same pool of worker threads
+        slicer.util.showStatusMessage("Extracting Surfaces...")
+
+        # Fill in the polydata as each surface is finished (in whichever order they finish)
+        for label in self.bone_labels:
+            polydata_list[label] = [None] * len(self.file_list)
+
+        futures = {}
+        for label in self.bone_labels:
             for curr_file in self.file_list:
+                future = executor.submit(self.Extract_Surface, images_list[curr_file], label)
+                futures[future] = (label, curr_file)
+
+        for iter, future in enumerate(concurrent.futures.as_completed(futures)):
+
+            # Update the status bar (start at 10%)
+            self.Update_Progress(10 + float(iter+1)/len(futures)*100/5, force=(iter+1 == len(futures))) # Use 20% of the bar for this
+
+            label, curr_file = futures[future]
+            polydata = future.result()
+            polydata_list[label][curr_file] = polydata
+
+            # Create model node ("Extract_Shapes") and add to scene (has to be on the main thread)
+            if self.show_extracted_shapes.checked == True:                    
+                Extract_Shapes = slicer.vtkMRMLModelNode()
+                Extract_Shapes.SetAndObservePolyData(polydata)
+                modelDisplay = slicer.vtkMRMLModelDisplayNode()
+                modelDisplay.SetSliceIntersectionVisibility(True) # Show in slice view
+                modelDisplay.SetVisibility(True) # Show in 3D view
+                slicer.mrmlScene.AddNode(modelDisplay)
+                Extract_Shapes.SetAndObserveDisplayNodeID(modelDisplay.GetID())
+                slicer.mrmlScene.AddNode(Extract_Shapes) 
+
+        # The worker threads (and the extraction pipelines cached in them) are released here
+        executor.shutdown()
+
+        # Only the surfaces are needed from here on so release the images (and the finished futures holding the surfaces)
+        # The images are by far the largest data so this frees most of the memory before the registration
+        del images_list
+        del futures
 
-                # Update the status bar (start at 10%)
-                self.progressBar.setValue(10 + float(iter)/(len(self.bone_labels)*len(self.file_list))*100/5) # Use 20% of the bar for this
-                slicer.app.processEvents()
-                iter = iter + 1
-                slicer.util.showStatusMessage("Extracting Surfaces...")
-
-                polydata = self.Extract_Surface(images_list[curr_file], label)            
-                polydata_list[label].append(polydata)       
-
-                # Create model node ("Extract_Shapes") and add to scene
-                if self.show_extracted_shapes.checked == True:                    
-                    Extract_Shapes = slicer.vtkMRMLModelNode()
-                    Extract_Shapes.SetAndObservePolyData(polydata)
-                    modelDisplay = slicer.vtkMRMLModelDisplayNode()
-                    modelDisplay.SetSliceIntersectionVisibility(True) # Show in slice view
-                    modelDisplay.SetVisibility(True) # Show in 3D view
-                    slicer.mrmlScene.AddNode(modelDisplay)
-                    Extract_Shapes.SetAndObserveDisplayNodeID(modelDisplay.GetID())
-                    slicer.mrmlScene.AddNode(Extract_Shapes) 
+        # Write the .PLY files in the background (using a few threads) while the computation continues
+        write_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        write_futures = []
 
         # Save each registered bone separately?
         if self.Save_Extracted_Bones_Separately.checked == True:        
 
             for label in self.bone_labels: 
-                for i in range(0,len(self.file_list)):           
+                for i in range(len(self.file_list)):           
                     path = os.path.join(self.output_directory_path, 'Bone_' + str(label) + '_position_' + str(i) + '.ply')    
-                    plyWriter = vtk.vtkPLYWriter()
-                    plyWriter.SetFileName(path)
-                    plyWriter.SetInputData(polydata_list[label][i])
-                    plyWriter.Write()
-                    print('Saved: ' + path)
+                    write_futures.append(write_executor.submit(self.Write_PLY, polydata_list[label][i], path))
 
         # If this is set to true, stop the computation after extracting and smoothing the bones
         if self.Skip_Registration.checked == True:
 
-            # Set the status bar to 100%
-            self.progressBar.setValue(100)
+            # Wait for the .PLY files to finish writing
+            self.Finish_Writing(write_executor, write_futures)
 
-            slicer.app.processEvents()
+            # Set the status bar to 100%
+            self.Update_Progress(100, force=True)
             slicer.util.showStatusMessage("Skipping Registration Step...")
 
             # Hide the status bar
@@ -657,80 +668,76 @@ class Create_Training_DataWidget:
             return 0;
 
         # Update the status bar (start at 30%)
-        self.progressBar.setValue(30 + 20) # Use 20% of the bar for this
-        slicer.app.processEvents()
+        self.Update_Progress(30 + 20, force=True) # Use 20% of the bar for this
         slicer.util.showStatusMessage("Calculating Reference Shapes...")
 
         # Don't use the mean shapes
         # Use the bone shapes from volunteer 1 instead of the mean shape for each bone
 
-        # Initialize a Python list to hold the reference shapes
-        reference_shapes = []
-
-        # One index for each bone label (ranges from 1 to 9)
-        for i in range(0,self.max_bone_label+1):
-            reference_shapes.append([])
+        # Initialize a Python dictionary to hold the reference shapes (keyed by the bone label)
+        reference_shapes = {}
 
         # Get the bone shapes from the first volunteer and save them
         for label in self.bone_labels:
-            reference_shapes[label].append(polydata_list[label][0]) 
+            reference_shapes[label] = polydata_list[label][0]
 
         ######### Register the reference shape to each bone position #########
 
-        iter_bar = 0 # For status bar
+        # Each registration is independent so run them using a pool of worker threads
+        # Threads are used instead of processes since the VTK objects can not be pickled and VTK releases the GIL while registering
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=multiprocessing.cpu_count())
 
-        for label in self.bone_labels:          
-            for i in range(0,len(self.file_list)): 
+        slicer.util.showStatusMessage("Registering Reference Shapes...")
 
-                # Update the status bar (start at 50%)
-                self.progressBar.setValue(50 + float(iter_bar)/(len(self.bone_labels)*len(self.file_list))*100/5) # Use 20% of the bar for this
-                slicer.app.processEvents()
-                iter_bar = iter_bar + 1
-                slicer.util.showStatusMessage("Registering Reference Shapes...")
- 
-                transformedSource = self.IterativeClosestPoint(target=polydata_list[label][i], source=reference_shapes[label][0]) 
+        tasks = [(label, i) for label in self.bone_labels for i in range(len(self.file_list))]
 
-                # Replace the surface of file i and label with the registered reference shape for that particular bone
-                polydata_list[label][i] = transformedSource
+        def Register_Reference_Shape(label, i):
+            return self.IterativeClosestPoint(target=polydata_list[label][i], source=reference_shapes[label]) 
 
-        iter_bar = 0 # For status bar
+        # Update the status bar (start at 50%)
+        results = self.Run_Tasks(executor, Register_Reference_Shape, tasks, 50, 20) # Use 20% of the bar for this
+
+        # Replace the surface of file i and label with the registered reference shape for that particular bone
+        for (label, i), transformedSource in zip(tasks, results):
+            polydata_list[label][i] = transformedSource
 
         ######### Register the reference bone (usually the radius for the wrist) for all the volunteers together #########
-        for label in self.bone_labels:
-            for i in range(0,len(self.file_list)): 
+        slicer.util.showStatusMessage("Registering Radius Together...")
+
+        # The reference bone of the first volunteer is the target for all of the registrations below
+        ref_target = polydata_list[self.ref_label][0]
 
-                # !! IMPORTANT !! Register the reference bone last (or else the bones afterwards will not register correctly)
-                # Skip the reference label for now (register after all the other bones are registered)
+        # The transform registering the reference bone of each volunteer to the first volunteer is the same for all of the bones
+        # So find it once for each volunteer and then apply it to every bone (including the reference bone)
+        tasks = [(i,) for i in range(len(self.file_list))]
 
-                if label != self.ref_label:
+        def Register_To_Reference_Bone(i):
+            # Each worker thread builds its own cell locator for the target (only once per thread)
+            return self.ICP_Transform(source=polydata_list[self.ref_label][i], target=ref_target, target_locator=self.Get_Thread_Locator(ref_target)) 
 
-                    # Update the status bar (start at 70%)
-                    self.progressBar.setValue(70 + float(iter_bar)/(len(self.bone_labels)*len(self.file_list))*100/5) # Use 20% of the bar for this
-                    slicer.app.processEvents()
-                    iter_bar = iter_bar + 1
-                    slicer.util.showStatusMessage("Registering Radius Together...")
+        # Update the status bar (start at 70%)
+        ref_transforms = self.Run_Tasks(executor, Register_To_Reference_Bone, tasks, 70, 20) # Use 20% of the bar for this
 
-                    polydata_list[label][i] = self.IterativeClosestPoint(target=polydata_list[self.ref_label][0], source=polydata_list[self.ref_label][i], reference=polydata_list[label][i]) 
+        for label in self.bone_labels:
+            for i in range(len(self.file_list)):
+                polydata_list[label][i] = self.Transform_Surface(polydata_list[label][i], ref_transforms[i])
 
-        # Now register the reference label bones together
-        for i in range(0,len(self.file_list)): 
-            polydata_list[self.ref_label][i] = self.IterativeClosestPoint(target=polydata_list[self.ref_label][0], source=polydata_list[self.ref_label][i], reference=polydata_list[self.ref_label][i]) 
+        executor.shutdown()
 
+        iter_bar = 0 # For status bar
 
         ######### Save the output #########
 
         # Should the reference bone be remove (i.e. not saved) in the final PLY surface file?
         if self.Remove_Ref_Bone.checked == True:
-            index = np.argwhere(self.bone_labels==self.ref_label)
-            self.bone_labels = np.delete(self.bone_labels, index)
+            self.bone_labels = tuple(label for label in self.bone_labels if label != self.ref_label)
 
         # Combine the surfaces of the wrist for each person and save as a .PLY file
-        for i in range(0,len(self.file_list)): 
+        for i in range(len(self.file_list)): 
             temp_combine_list = []
 
             # Update the status bar (start at 90%)
-            self.progressBar.setValue(90 + float(i)/len(self.file_list)*100/10) # Use 10% of the bar for this
-            slicer.app.processEvents()
+            self.Update_Progress(90 + float(i)/len(self.file_list)*100/10) # Use 10% of the bar for this
             iter_bar = iter_bar + 1
             slicer.util.showStatusMessage("Saving Output Surfaces...")
 
@@ -763,22 +770,18 @@ class Create_Training_DataWidget:
                 slicer.mrmlScene.AddNode(ICP_Result) 
 
             # Write the combined polydata surface to a .PLY file
-            plyWriter = vtk.vtkPLYWriter()
             path = os.path.join(self.output_directory_path, str(self.files[i][:-4]) + '_combined.ply')
-            plyWriter.SetFileName(path)
-            plyWriter.SetInputData(combined_polydata)
-            plyWriter.Write()
-            print('Saved: ' + path)
+            write_futures.append(write_executor.submit(self.Write_PLY, combined_polydata, path))
 
             # Save each registered bone separately as well?
             if self.Save_Registered_Bones_Separately.checked == True:        
 
                 for label in self.bone_labels:                   
                     path = os.path.join(self.output_directory_path, 'Position_' + str(i) + '_bone_' + str(label) + '.ply')    
-                    plyWriter.SetFileName(path)
-                    plyWriter.SetInputData(polydata_list[label][i])
-                    plyWriter.Write()
-                    print('Saved: ' + path)
+                    write_futures.append(write_executor.submit(self.Write_PLY, polydata_list[label][i], path))
+
+        # Wait for the .PLY files to finish writing
+        self.Finish_Writing(write_executor, write_futures)
 
         # Set the status bar to 100%
         self.progressBar.setValue(100)
@@ -791,48 +794,249 @@ class Create_Training_DataWidget:
 
         return 0
 
+    def Load_Image_File(self, filename, flip_axes):
+        # Load a single image and flip it along the given numpy axes (if any)
+        # Called from the worker threads in onCompute so nothing here should touch the Slicer scene or GUI
+        # (the flip checkboxes are read in onCompute on the main thread)
+        image = self.load_image(filename).GetOutput()
+
+        if len(flip_axes) > 0:
+            image = self.Flip_Image(image, flip_axes)
+
+        return image
+
+    def Flip_Image(self, image, flip_axes):
+        # Flip a vtk image along the given numpy axes (in (z, y, x) order) about the center of the image
+        # All the axes are flipped together so the voxels are only copied once
+
+        dims = image.GetDimensions()
+        scalars = image.GetPointData().GetScalars()
+        array = vtk_to_numpy(scalars).reshape(dims[2], dims[1], dims[0], -1)
+
+        # Create a new (empty) array of the same type for the flipped voxels
+        flipped_scalars = scalars.NewInstance()
+        flipped_scalars.SetName(scalars.GetName())
+        flipped_scalars.SetNumberOfComponents(scalars.GetNumberOfComponents())
+        flipped_scalars.SetNumberOfTuples(scalars.GetNumberOfTuples())
+
+        # Copy the flipped voxels directly into the new vtk array (through a numpy view of it)
+        flipped_array = vtk_to_numpy(flipped_scalars).reshape(array.shape)
+        flipped_array[...] = np.flip(array, axis=tuple(flip_axes))
+
+        # The flipped image has the same dimensions, spacing, and origin
+        flipped_image = vtk.vtkImageData()
+        flipped_image.CopyStructure(image)
+        flipped_image.GetPointData().SetScalars(flipped_scalars)
+
+        return flipped_image
+
+    def Show_Image(self, image, name):
+        # Show a vtk image in the Slicer slice viewers as a label map volume node
+        # The node name has a prefix so only the debug nodes of this module are replaced (not other nodes with the same name)
+        node_name = 'CTD_debug_' + name
+        node = slicer.mrmlScene.GetFirstNodeByName(node_name)
+
+        if node is None:
+            node = slicer.vtkMRMLLabelMapVolumeNode()
+            node.SetName(node_name)
+            slicer.mrmlScene.AddNode(node)
+            node.CreateDefaultDisplayNodes()
+
+        # Use a shallow copy (shares the voxel data) since the image is also used by the worker threads
+        # The origin, spacing, and directions are saved in the node (IJKToRAS) so the image itself has none
+        node_image = vtk.vtkImageData()
+        node_image.ShallowCopy(image)
+        node.SetOrigin(node_image.GetOrigin())
+        node.SetSpacing(node_image.GetSpacing())
+        node_image.SetOrigin(0, 0, 0)
+        node_image.SetSpacing(1, 1, 1)
+
+        # vtkImageData only has a direction matrix in VTK 9 and later (otherwise the directions are the identity)
+        directions = vtk.vtkMatrix4x4()
+        if hasattr(node_image, 'GetDirectionMatrix'):
+            direction_matrix = node_image.GetDirectionMatrix()
+            for row in range(3):
+                for column in range(3):
+                    directions.SetElement(row, column, direction_matrix.GetElement(row, column))
+            node_image.SetDirectionMatrix(1, 0, 0, 0, 1, 0, 0, 0, 1)
+        node.SetIJKToRASDirectionMatrix(directions)
+
+        node.SetAndObserveImageData(node_image)
+
+        # Show the image in the slice viewers
+        slicer.util.setSliceViewerLayers(label=node)
+
+        return node
+
     def Extract_Surface(self, imgReader, label):
         # Extract a vtk surface from a vtk image
+        # The same label and smoothing parameters are used for every image
+        # So build the pipeline once for each label (in each worker thread) and reuse it for every image
+        # Each worker thread has its own dictionary of pipelines (created the first time the thread runs)
+        pipelines = getattr(self.thread_data, 'pipelines', None)
+        if pipelines is None:
+            pipelines = self.thread_data.pipelines = {}
+
+        key = (label, self.smoothing_iterations, self.relaxation_factor, self.decimate_surface)
+        pipeline = pipelines.get(key)
+
+        if pipeline is None:
+            # Discrete flying edges extracts the surface of the voxels with the bone label directly from the label image
+            # (no need to threshold the image first) and is multi-threaded
+            # It is only in VTK 9 and later (Slicer 4.x has VTK 8) so use discrete marching cubes otherwise (same surface but slower)
+            if hasattr(vtk, 'vtkDiscreteFlyingEdges3D'):
+                boneExtractor = vtk.vtkDiscreteFlyingEdges3D()
+            else:
+                boneExtractor = vtk.vtkDiscreteMarchingCubes()
+            boneExtractor.SetValue(0,label) 
+
+            # Keep only the largest connected region of the bone
+            # Noisy segmentations give small disconnected islands which pollute the registration (ICP) and slow it down
+            largestRegion = vtk.vtkPolyDataConnectivityFilter()
+            largestRegion.SetInputConnection(boneExtractor.GetOutputPort())
+            largestRegion.SetExtractionModeToLargestRegion()
+
+            pipeline = pipelines[key] = (boneExtractor, self.Smoothing_Pipeline(largestRegion))
+
+        boneExtractor, smoothingPipeline = pipeline
+
+        if not isinstance(imgReader, vtk.vtkImageData):
+            boneExtractor.SetInputConnection(imgReader.GetOutputPort())
+        else:
+            # Use a shallow copy of the image (shares the voxel data) since the same image is used by several threads at once
+            image = vtk.vtkImageData()
+            image.ShallowCopy(imgReader)
+            boneExtractor.SetInputData(image)
 
-        treshold_filter = vtk.vtkImageThreshold()
-        treshold_filter.ThresholdBetween(label,label)
+        smoothingPipeline.Update()
 
-        try:
-            treshold_filter.SetInputConnection(imgReader.GetOutputPort())
-        except:
-            treshold_filter.SetInputData(imgReader)
+        # Copy the output since the pipeline output is reused for the next image
+        output_polydata = vtk.vtkPolyData()
+        output_polydata.DeepCopy(smoothingPipeline.GetOutput())
+
+        return output_polydata
+
+    def Update_Progress(self, value, force=False):
+        # Update the status bar and let Slicer process the GUI events
+        # Processing the events is slow so only update about 30 times a second (unless forced, i.e. at the end of a loop)
+        now = time.monotonic()
+
+        if force == True or now - self.last_progress_time > 0.033:
+            self.progressBar.setValue(value)
+            slicer.app.processEvents()
+            self.last_progress_time = now
 
-        treshold_filter.ReplaceInOn()
-        treshold_filter.SetInValue(255) # Replace the bone label = label to 255 (threshold again using contour filter)
-        treshold_filter.Update()
+    def Run_Tasks(self, executor, function, tasks, progress_start, progress_range):
+        # Run function(*task) for each task using the pool of worker threads
+        # Returns the results in the same order as the tasks
+        # The status bar is updated (on the main thread) as each task finishes
+        futures = {}
+        for index, task in enumerate(tasks):
+            futures[executor.submit(function, *task)] = index
 
-        boneExtractor = vtk.vtkDiscreteMarchingCubes()
+        results = [None] * len(tasks)
 
+        for count, future in enumerate(concurrent.futures.as_completed(futures)):
+            self.Update_Progress(progress_start + float(count+1)/len(tasks)*progress_range, force=(count+1 == len(tasks)))
+
+            results[futures[future]] = future.result()
+
+        return results
+
+    def Get_Thread_Locator(self, target):
+        # Get the cell locator for the target surface built by the current thread
+        # The closest point search of vtkCellLocator is not thread safe so each worker thread needs its own locator
+        try:
+            locators = self.thread_data.locators
+        except AttributeError:
+            locators = self.thread_data.locators = {}
+
+        # The vtk objects can not be used as dictionary keys so use the object id
+        # The target is stored with the locator so the id can not be reused by another surface
+        if id(target) not in locators:
+            locators[id(target)] = (target, self.Build_Locator(target))
+
+        return locators[id(target)][1]
+
+    def Build_Locator(self, target):
+        # Build the cell locator used by ICP for finding the closest points on the target surface
+        # Uses the same settings as vtkIterativeClosestPointTransform so ICP can reuse it without rebuilding
+        locator = vtk.vtkCellLocator()
+        locator.SetDataSet(self.Downsample_Surface(self.Copy_Surface(target)))
+        locator.SetNumberOfCellsPerBucket(1)
+        locator.BuildLocator()
+
+        return locator
+
+    def Copy_Surface(self, surface):
+        # Shallow copy a surface (shares the points and cells) so it can be used by several threads at once
+        # Works with either a vtk poly data or a Slicer model node
         try:
-            boneExtractor.SetInputData(treshold_filter.GetOutput())
+            surface = surface.GetPolyData()
         except:
-            boneExtractor.SetInputConnection(treshold_filter.GetOutputPort())
+            pass
 
-        # The bone label(s) of interest were set to 255 above using the image threshold filter
-        boneExtractor.SetValue(0,255) 
-        boneExtractor.Update()
+        surface_copy = vtk.vtkPolyData()
+        surface_copy.ShallowCopy(surface)
 
-        output_polydata = self.Smooth_Surface(boneExtractor.GetOutput())
+        return surface_copy
 
+    def Downsample_Surface(self, surface):
+        # Downsample a surface for faster ICP registration by clustering the points within each voxel
+        # Returns the surface unchanged if the ICP voxel size is zero
+        if self.icp_voxel_size <= 0:
+            return surface
 
-        return output_polydata
+        clustering = vtk.vtkQuadricClustering()
+        clustering.SetInputData(surface)
+        clustering.SetDivisionOrigin(0, 0, 0)
+        clustering.SetDivisionSpacing(self.icp_voxel_size, self.icp_voxel_size, self.icp_voxel_size)
+        clustering.Update()
+
+        return clustering.GetOutput()
 
-    def IterativeClosestPoint(self, source, target, reference=[]):
+    def IterativeClosestPoint(self, source, target, reference=[], target_locator=None):
         # Iterative closest point surface registration
+        # Returns the registered source (or the reference surface with the same transform applied if given)
+        # target_locator is an optional cell locator (from Build_Locator) already built for the target surface
+
+        matrix = self.ICP_Transform(source, target, target_locator)
 
-        icp = vtk.vtkIterativeClosestPointTransform()
+        # If there is a reference surface apply the ICP transform to it
+        if reference != []:
+            # Is there is a referece surface return that instead
+            return self.Transform_Surface(reference, matrix)
+        else:
+            # If there in NOT a reference surface, return the registered source
+            return self.Transform_Surface(source, matrix)
+
+    def ICP_Transform(self, source, target, target_locator=None):
+        # Find the transform registering the source surface to the target surface using iterative closest point
+        # Returns the transform as a vtkMatrix4x4
+
+        # Use shallow copies of the surfaces since the same surfaces are used by several threads at once
+        source = self.Copy_Surface(source)
 
+        # Reuse the ICP object of this worker thread (created on the first registration of the thread)
         try:
-            icp.SetSource(source.GetPolyData())
-            icp.SetTarget(target.GetPolyData())
-        except:
-            icp.SetSource(source)
-            icp.SetTarget(target)
+            icp = self.thread_data.icp
+        except AttributeError:
+            icp = self.thread_data.icp = vtk.vtkIterativeClosestPointTransform()
+            self.thread_data.icp_locator = vtk.vtkCellLocator()
+
+        if target_locator is not None:
+            # Use the (copy of the) target surface the locator was built with so it is not rebuilt
+            icp.SetLocator(target_locator)
+            target = target_locator.GetDataSet()
+        else:
+            # Use the thread's own locator (rebuilt by ICP for the new target)
+            icp.SetLocator(self.thread_data.icp_locator)
+            target = self.Downsample_Surface(self.Copy_Surface(target))
+
+        # Register the downsampled surfaces (if the voxel size is set)
+        # The transform is applied to the full resolution surfaces afterwards
+        icp.SetSource(self.Downsample_Surface(source))
+        icp.SetTarget(target)
 
         if self.icp_mode == 'Rigid':
             icp.GetLandmarkTransform().SetModeToRigidBody()
@@ -842,8 +1046,8 @@ class Create_Training_DataWidget:
             icp.GetLandmarkTransform().SetModeToAffine()
                 
         # icp.DebugOn()
-        icp.SetMaximumNumberOfIterations(int(self.IterationNumber))  
-        icp.SetMaximumNumberOfLandmarks(int(self.LandmarkNumber))  
+        icp.SetMaximumNumberOfIterations(self.IterationNumber)  
+        icp.SetMaximumNumberOfLandmarks(self.LandmarkNumber)  
         icp.SetMaximumMeanDistance(self.RMS_Number) # A small number would use the maximum number of iterations
         icp.StartByMatchingCentroidsOn()
 
@@ -853,117 +1057,132 @@ class Create_Training_DataWidget:
         icp.Modified()
         icp.Update()
 
-        # Apply the resulting transform to the vtk poly data 
-        icpTransformFilter = vtk.vtkTransformPolyDataFilter()
-        try:
-            icpTransformFilter.SetInputData(source.GetPolyData())
-        except:
-            icpTransformFilter.SetInputData(source)
+        # Copy the resulting matrix (so it does not change if the ICP object is used again)
+        matrix = vtk.vtkMatrix4x4()
+        matrix.DeepCopy(icp.GetMatrix())
 
-        icpTransformFilter.SetTransform(icp)
-        icpTransformFilter.Update()
+        return matrix
 
-        # Update the source object with the transformed object
-        transformedSource = icpTransformFilter.GetOutput()
+    def Transform_Surface(self, surface, matrix):
+        # Apply a transform (vtkMatrix4x4) to a surface and return the transformed surface
 
-        # If there is a reference surface apply the ICP transform to it
-        if reference != []:
+        # Reuse the transform filter of this worker thread (created on the first use in the thread)
+        try:
+            transformFilter = self.thread_data.transform_filter
+        except AttributeError:
+            transformFilter = self.thread_data.transform_filter = vtk.vtkTransformPolyDataFilter()
+            transformFilter.SetTransform(vtk.vtkTransform())
+            transformFilter.SetOutputPointsPrecision(vtk.vtkAlgorithm.SINGLE_PRECISION)
 
-            # Apply the resulting transform also to the reference surface vtk poly data 
-            icpTransformFilter = vtk.vtkTransformPolyDataFilter()
-            try:
-                icpTransformFilter.SetInputData(reference.GetPolyData())
-            except:
-                icpTransformFilter.SetInputData(reference)
+        # The matrix elements are copied into the transform
+        transformFilter.GetTransform().SetMatrix(matrix)
 
-            icpTransformFilter.SetTransform(icp)
-            icpTransformFilter.Update()
+        # Use a shallow copy of the surface since the same surfaces are used by several threads at once
+        transformFilter.SetInputData(self.Copy_Surface(surface))
+        transformFilter.Update()
 
-            # Update the source object with the transformed object
-            transformedReference = icpTransformFilter.GetOutput()
+        # Return a copy of the output since the filter output is reused for the next surface
+        transformedSurface = vtk.vtkPolyData()
+        transformedSurface.ShallowCopy(transformFilter.GetOutput())
 
-            # Is there is a referece surface return that instead
-            return transformedReference
-        else:
-            # If there in NOT a reference surface, return the registered source
-            return transformedSource
+        return transformedSurface
 
-    def Smooth_Surface(self, surface):
-        # Take a vtk surface and run it through the smoothing pipeline
+    def Smoothing_Pipeline(self, input_filter):
+        # Connect the smoothing pipeline to the output of a vtk filter (i.e. the surface extraction)
+        # Returns the last filter of the pipeline (the pipeline is only run when it is updated)
 
         boneNormals = vtk.vtkPolyDataNormals()
-        try:
-            boneNormals.SetInputData(surface)
-        except:
-            boneNormals.SetInputConnection(surface.GetOutputPort())
-
-        boneNormals.Update()
+        boneNormals.SetInputConnection(input_filter.GetOutputPort())
 
         # Clean the polydata so that the edges are shared!
+        # Keep the points in single precision (float32) through the whole pipeline (double precision is not needed for the bone surfaces)
         cleanPolyData = vtk.vtkCleanPolyData()
         cleanPolyData.SetInputConnection(boneNormals.GetOutputPort())
-        cleanPolyData.Update()
-        polydata = cleanPolyData.GetOutput()
+        cleanPolyData.SetOutputPointsPrecision(vtk.vtkAlgorithm.SINGLE_PRECISION)
+        last_filter = cleanPolyData
+
+        # Only smoothing or decimation change the surface after the first clean
+        surface_changed = False
 
         if self.smoothing_iterations > 0:
             # Apply laplacian smoothing to the surface
             smoothingFilter = vtk.vtkSmoothPolyDataFilter()
-            smoothingFilter.SetInputData(polydata)
-            smoothingFilter.SetNumberOfIterations(int(self.smoothing_iterations))
+            smoothingFilter.SetInputConnection(last_filter.GetOutputPort())
+            smoothingFilter.SetNumberOfIterations(self.smoothing_iterations)
             smoothingFilter.SetRelaxationFactor(self.relaxation_factor)
-            smoothingFilter.Update()
-
-            polydata = smoothingFilter.GetOutput()
+            smoothingFilter.SetOutputPointsPrecision(vtk.vtkAlgorithm.SINGLE_PRECISION)
+            last_filter = smoothingFilter
+            surface_changed = True
 
         if self.decimate_surface  > 0 and self.decimate_surface < 1:
             # We want to preserve topology (not let any cracks form). This may
             # limit the total reduction possible, which we have specified at 80%.
             deci = vtk.vtkDecimatePro()
-            deci.SetInputData(polydata)
+            deci.SetInputConnection(last_filter.GetOutputPort())
             deci.SetTargetReduction(self.decimate_surface)
             deci.PreserveTopologyOn()
-            deci.Update()
-            polydata = deci.GetOutput()
+            deci.SetOutputPointsPrecision(vtk.vtkAlgorithm.SINGLE_PRECISION)
+            last_filter = deci
+            surface_changed = True
+
+        if not surface_changed:
+            # The first clean already shares the edges and carries the normals
+            # so the second clean and normals passes would only repeat the work
+            return cleanPolyData
 
         # Clean the polydata so that the edges are shared!
         cleanPolyData = vtk.vtkCleanPolyData()
-        cleanPolyData.SetInputData(polydata)
-        cleanPolyData.Update()
-        polydata = cleanPolyData.GetOutput()
+        cleanPolyData.SetInputConnection(last_filter.GetOutputPort())
+        cleanPolyData.SetOutputPointsPrecision(vtk.vtkAlgorithm.SINGLE_PRECISION)
 
         # Generate surface normals to give a better visualization        
         normals = vtk.vtkPolyDataNormals()
-        normals.SetInputData(polydata)
-        normals.Update()
-        polydata = normals.GetOutput()
+        normals.SetInputConnection(cleanPolyData.GetOutputPort())
 
-        return polydata
+        return normals
 
     def load_image(self, ImgFileName):
         # Load an image using the vtk image reader 
 
         imgReader = vtk.vtkNIFTIImageReader()
         imgReader.SetFileName(ImgFileName)
+        # Update() runs the reader and returns once the image is loaded
         imgReader.Update()
-
-        # This is needed for working on the Mac
-        # Perhaps the imgReader don't finish running in time?
-        # VTK uses 'lazy functions'
-        from vtk.util.numpy_support import vtk_to_numpy
-        array = vtk_to_numpy(imgReader.GetOutput().GetPointData().GetScalars())
         
         return imgReader
     
+    def Write_PLY(self, polydata, path):
+        # Write a surface to a binary .PLY file
+        # Called from the writer threads in onCompute so it uses its own writer (and a shallow copy of the surface)
+        plyWriter = vtk.vtkPLYWriter()
+        plyWriter.SetFileTypeToBinary()
+        plyWriter.SetFileName(path)
+        plyWriter.SetInputData(self.Copy_Surface(polydata))
+        plyWriter.Write()
+
+        return path
+
+    def Finish_Writing(self, write_executor, write_futures):
+        # Wait for all of the background .PLY writes to finish
+        for future in write_futures:
+            path = future.result()
+            print('Saved: ' + path)
+
+        write_executor.shutdown()
+
     def Combine_Surfaces(self, polydata_list):
         # Combine some number of polydata together
         # For example, useful for combining all the bones of a joint back together for saving to a .PLY file
 
         # Append the meshes together
+        # Set the number of inputs once (instead of growing the input connections for each surface added)
         appendFilter = vtk.vtkAppendPolyData()
+        appendFilter.UserManagedInputsOn()
+        appendFilter.SetNumberOfInputs(len(polydata_list))
 
         # Loop through each surface in the list of polydata and input into the filter
-        for i in range(0, len(polydata_list)):
-            appendFilter.AddInputData(polydata_list[i])
+        for i in range(len(polydata_list)):
+            appendFilter.SetInputDataByNumber(i, polydata_list[i])
 
         # Update the combinded polydata filter
         appendFilter.Update()
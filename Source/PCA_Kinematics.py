@@ -1,15 +1,15 @@
 from __main__ import vtk, qt, ctk, slicer
-import EditorLib
 
-import SimpleITK as sitk
-import sitkUtils
 import numpy as np
-import multiprocessing
-import timeit
-import time
+from numpy.polynomial import chebyshev
+import concurrent.futures
 import os
+import re
 
-from vtk.util.numpy_support import vtk_to_numpy
+from vtk.util.numpy_support import vtk_to_numpy, numpy_to_vtk
+
+# Regular expression for splitting filenames into string and number chunks (used for sorting the files numerically)
+alphanum_regex = re.compile('([0-9]+)')
 
 #
 # Create_PCA_Model
@@ -77,17 +77,22 @@ class PCA_KinematicsWidget:
         self.font_type = "Arial"
         self.font_size = 12
 
+        # Create the font once and use it for every widget
+        self.font = qt.QFont(self.font_type, self.font_size)
+
         # Number of eigenvalues to use
         self.NumEVs = 5
 
         # Create a variable to hold the model
         # This will be checked to see if the model needs to be run again
         self.pca_model = []
-        self.polydata_list = []
 
         # Flag to see if a new folder of surfaces was selected
         self.New_Folder_Selected = False
 
+        # The folder and the surface files (names, modification times, and sizes) the current model was created from
+        self.Training_Data_Key = None
+
         # Flag to show a new transform
         self.Show_New_Transform = False
 
@@ -100,6 +105,10 @@ class PCA_KinematicsWidget:
         # Flag to check if OnCompute() is already running
         self.Already_Running = False
 
+        # Polynomials fitted to the fitted model coefficients (for the time slider)
+        # Set back to None when the fitted coefficients or the fitting order change so they are fitted again
+        self.Polyfit_Cache = None
+
         # Variable to hold the landmark indicies for the wrist angle measurements
         self.landmark_index = []
 
@@ -112,10 +121,6 @@ class PCA_KinematicsWidget:
         # Flag to show the progress bar or not
         self.show_progress_bar = True
 
-        # Initilize a flag to know if the sliders are reseting
-        # This prevents running the autorun for each slider that is being reset
-        self.reseting_state = False
-        
         # Variables to hold the file paths 
         self.directory_path = []
         self.Directory_Input_Surfaces_Fitting = []
@@ -126,16 +131,104 @@ class PCA_KinematicsWidget:
         self.FittingTransform = vtk.vtkTransform()
         self.FittingTransform.Identity()
 
+        # Polydata holding the current instance of the PCA model and the filter moving it with the FittingTransform
+        # Both are reused for every new instance of the model (only the points of the polydata are updated)
+        self.Model_Shape = vtk.vtkPolyData()
+        self.Model_Transform_Filter = vtk.vtkTransformPolyDataFilter()
+        self.Model_Transform_Filter.SetInputData(self.Model_Shape)
+        self.Model_Transform_Filter.SetTransform(self.FittingTransform)
+
+        # Numpy array with the points of the current instance of the model (and the vtkPoints using its memory)
+        self.Model_Points = None
+        self.Model_VTK_Points = None
+
+        # Model coefficients and fitting transform time stamp of the current instance of the model
+        # and the color of the model nodes (to skip updates that don't change anything)
+        self.Model_Instance_Key = None
+        self.Model_Colors = None
+
+        # Decimated copy of the model shown while a model coefficient slider is being dragged
+        # The points of the preview are a subset of the model points (Preview_Point_Ids) so it uses the same eigenvectors
+        self.Preview_Shape = None
+        self.Preview_Transform_Filter = vtk.vtkTransformPolyDataFilter()
+        self.Preview_Transform_Filter.SetTransform(self.FittingTransform)
+
+        # Flag to know if a model coefficient slider is being dragged
+        self.Slider_Dragging = False
+
+        # Model nodes in the scene showing the model (the key is the node name)
+        self.Model_Nodes = {}
+
+        # Pipeline for the vectors normal to the model surface (i.e. glyphs)
+        # It is created once and only the input polydata is changed for each new instance of the model
+        self.Glyph_Triangle_Normals = vtk.vtkTriangleMeshPointNormals()
+        self.Glyph_Normals = vtk.vtkPolyDataNormals()
+        self.Glyph_Normals.FlipNormalsOn()
+        self.Glyph_Normals.SetFeatureAngle(60.0)
+
+        # vtkReverseSense is used to flip the vector 
+        self.Glyph_Reverse = vtk.vtkReverseSense()
+        self.Glyph_Reverse.ReverseCellsOn()
+        self.Glyph_Reverse.ReverseNormalsOn()
+
+        # Only show a glyph at every n-th point so there are at most Glyph_Max_Points glyphs
+        # (a glyph at each of the many points of the surface is a lot of polygons to render)
+        self.Glyph_Max_Points = 2000
+        self.Glyph_Mask = vtk.vtkMaskPoints()
+        self.Glyph_Mask.SetMaximumNumberOfPoints(self.Glyph_Max_Points)
+        self.Glyph_Mask.GenerateVerticesOff()
+
+        # Source for the glyph filter
+        self.Glyph_Arrow = vtk.vtkArrowSource()
+        self.Glyph_Arrow.SetTipResolution(4) # 16
+        self.Glyph_Arrow.SetTipLength(0.05) # 0.3
+        self.Glyph_Arrow.SetTipRadius(0.05) # 0.1
+
+        self.Glyph_Filter = vtk.vtkGlyph3D()
+        self.Glyph_Filter.SetSourceConnection(self.Glyph_Arrow.GetOutputPort())
+        self.Glyph_Filter.SetInputConnection(self.Glyph_Mask.GetOutputPort())
+        self.Glyph_Filter.SetVectorModeToUseNormal()
+        self.Glyph_Filter.SetScaleFactor(1) # 1
+        self.Glyph_Filter.SetColorModeToColorByVector()
+        self.Glyph_Filter.SetScaleModeToScaleByVector()
+        self.Glyph_Filter.OrientOn()
+
+        # Timer to update the model once the sliders stop moving
+        # Dragging a slider gives many valueChanged signals so only run onCompute() after 50 ms without a change
+        self.Compute_Timer = qt.QTimer()
+        self.Compute_Timer.setSingleShot(True)
+        self.Compute_Timer.setInterval(50)
+        self.Compute_Timer.connect('timeout()', self.onCompute)
+
+        # Timer to update the color of the model nodes once the color sliders stop moving
+        self.Color_Timer = qt.QTimer()
+        self.Color_Timer.setSingleShot(True)
+        self.Color_Timer.setInterval(50)
+        self.Color_Timer.connect('timeout()', self.Apply_Model_Colors)
+
+        # Timer to update the model once the time slider (for the fitted coefficients) stops moving
+        self.Fitted_Timer = qt.QTimer()
+        self.Fitted_Timer.setSingleShot(True)
+        self.Fitted_Timer.setInterval(50)
+        self.Fitted_Timer.connect('timeout()', self.onFittedTimeout)
+
+        # Timer to show the frames when looping through the model coefficients (about 30 frames per second)
+        self.Loop_Timer = qt.QTimer()
+        self.Loop_Timer.setInterval(33)
+        self.Loop_Timer.connect('timeout()', self.onLoopTimeout)
+
 
     def setup(self):
         frame = qt.QFrame()
         frameLayout = qt.QFormLayout()
         frame.setLayout(frameLayout)
-        self.parent.layout().addWidget(frame)
+
+        # Don't repaint the frame while all the widgets are being added (only once at the end)
+        frame.setUpdatesEnabled(False)
 
         # Choose Directory button to choose the folder for saving the registered image 
         self.directoryButton = qt.QPushButton("Choose Training Data Folder")
-        self.directoryButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.directoryButton.setFont(self.font)
         self.directoryButton.toolTip = "Choose the folder with the training data surfaces (in .PLY format). \
         This training data is easily created using the 'Create PCA Kinematics Training Data' module."
         frameLayout.addWidget(self.directoryButton)
@@ -143,14 +236,14 @@ class PCA_KinematicsWidget:
 
         # Compute the bone displacement model button
         self.computeButton = qt.QPushButton("Create Bone Displacement Model")
-        self.computeButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.computeButton.setFont(self.font)
         self.computeButton.toolTip = "Create the statistical model of bone displacement using the folder of training data."
         frameLayout.addWidget(self.computeButton)
         self.computeButton.connect('clicked()', self.onCompute)
 
         # Model coefficient selection sliders collapsible button
         self.Model_Sliders_CollapsibleButton = ctk.ctkCollapsibleButton()
-        self.Model_Sliders_CollapsibleButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.Model_Sliders_CollapsibleButton.setFont(self.font)
         self.Model_Sliders_CollapsibleButton.text = "Model Coefficent Select"
         self.Model_Sliders_CollapsibleButton.collapsed = True # Default is to not show     
         frameLayout.addWidget(self.Model_Sliders_CollapsibleButton) 
@@ -159,110 +252,46 @@ class PCA_KinematicsWidget:
         self.Model_Sliders_FormLayout = qt.QFormLayout(self.Model_Sliders_CollapsibleButton)
 
         # Slider for selecting the first model coefficient     
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("1st Coefficent: ")
         tooltip = "Select the 1st model coefficient (i.e. the scaling term (alpha)) to multiply times the first eigenvalue."
-        self.label.setToolTip(tooltip)
-        self.FirstEVSlider = ctk.ctkSliderWidget()
-        self.FirstEVSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.FirstEVSlider.setToolTip(tooltip)
-        self.FirstEVSlider.minimum = -self.slider_range
-        self.FirstEVSlider.maximum = self.slider_range
-        self.FirstEVSlider.value = 0
-        self.FirstEVSlider.singleStep = 0.1
-        self.FirstEVSlider.tickInterval = 0.1
-        self.FirstEVSlider.decimals = 2
-        self.FirstEVSlider.connect('valueChanged(double)', self.onFirstEVSliderChange)
-        self.Model_Sliders_FormLayout.addRow(self.label, self.FirstEVSlider)        
+        self.FirstEVSlider = self.Create_Slider(self.Model_Sliders_FormLayout, "1st Coefficent: ", tooltip, -self.slider_range, self.slider_range, 0, 0.1, 0.1, 2, self.onFirstEVSliderChange)
         self.FirstEV = self.FirstEVSlider.value # Set default value
 
         # Slider for selecting the scaling of the second eigenvector of the model  
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("2nd Coefficent: ")
         tooltip = "Select the 2nd model coefficient (i.e. the scaling term (alpha)) to multiply times the first eigenvalue."
-        self.label.setToolTip(tooltip)
-        self.SecondEVSlider = ctk.ctkSliderWidget()
-        self.SecondEVSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.SecondEVSlider.setToolTip(tooltip)
-        self.SecondEVSlider.minimum = -self.slider_range
-        self.SecondEVSlider.maximum = self.slider_range
-        self.SecondEVSlider.value = 0
-        self.SecondEVSlider.singleStep = 0.05
-        self.SecondEVSlider.tickInterval = 0.1
-        self.SecondEVSlider.decimals = 2
-        self.SecondEVSlider.connect('valueChanged(double)', self.onSecondEVSliderChange)
-        self.Model_Sliders_FormLayout.addRow(self.label, self.SecondEVSlider)        
+        self.SecondEVSlider = self.Create_Slider(self.Model_Sliders_FormLayout, "2nd Coefficent: ", tooltip, -self.slider_range, self.slider_range, 0, 0.05, 0.1, 2, self.onSecondEVSliderChange)
         self.SecondEV = self.SecondEVSlider.value # Set default value
 
         # Slider for selecting the scaling of the third eigenvector of the model    
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("3rd Coefficent: ")
         tooltip = "Select the 3rd model coefficient (i.e. the scaling term (alpha)) to multiply times the first eigenvalue."
-        self.label.setToolTip(tooltip)
-        self.ThirdEVSlider = ctk.ctkSliderWidget()
-        self.ThirdEVSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.ThirdEVSlider.setToolTip(tooltip)
-        self.ThirdEVSlider.minimum = -self.slider_range
-        self.ThirdEVSlider.maximum = self.slider_range
-        self.ThirdEVSlider.value = 0
-        self.ThirdEVSlider.singleStep = 0.05
-        self.ThirdEVSlider.tickInterval = 0.1
-        self.ThirdEVSlider.decimals = 2
-        self.ThirdEVSlider.connect('valueChanged(double)', self.onThirdEVSliderChange)
-        self.Model_Sliders_FormLayout.addRow(self.label, self.ThirdEVSlider)
+        self.ThirdEVSlider = self.Create_Slider(self.Model_Sliders_FormLayout, "3rd Coefficent: ", tooltip, -self.slider_range, self.slider_range, 0, 0.05, 0.1, 2, self.onThirdEVSliderChange)
         self.ThirdEV = self.ThirdEVSlider.value # Set default value
 
         # Slider for selecting the scaling of the fourth eigenvector of the model 
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("4th Coefficent: ")
         tooltip = "Select the 4th model coefficient (i.e. the scaling term (alpha)) to multiply times the first eigenvalue."
-        self.label.setToolTip(tooltip)   
-        self.FourthEVSlider = ctk.ctkSliderWidget()
-        self.FourthEVSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.FourthEVSlider.setToolTip(tooltip)
-        self.FourthEVSlider.minimum = -self.slider_range
-        self.FourthEVSlider.maximum = self.slider_range
-        self.FourthEVSlider.value = 0
-        self.FourthEVSlider.singleStep = 0.05
-        self.FourthEVSlider.tickInterval = 0.1
-        self.FourthEVSlider.decimals = 2
-        self.FourthEVSlider.connect('valueChanged(double)', self.onFourthEVSliderChange)
-        self.Model_Sliders_FormLayout.addRow(self.label, self.FourthEVSlider)        
+        self.FourthEVSlider = self.Create_Slider(self.Model_Sliders_FormLayout, "4th Coefficent: ", tooltip, -self.slider_range, self.slider_range, 0, 0.05, 0.1, 2, self.onFourthEVSliderChange)
         self.FourthEV = self.FourthEVSlider.value # Set default value
 
         # Slider for selecting the scaling of the fifth eigenvector of the model    
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("5th Coefficent: ")
         tooltip = "Select the 5th model coefficient (i.e. the scaling term (alpha)) to multiply times the first eigenvalue."
-        self.label.setToolTip(tooltip)        
-        self.FifthEVSlider = ctk.ctkSliderWidget()
-        self.FifthEVSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.FifthEVSlider.setToolTip(tooltip)
-        self.FifthEVSlider.minimum = -self.slider_range
-        self.FifthEVSlider.maximum = self.slider_range
-        self.FifthEVSlider.value = 0
-        self.FifthEVSlider.singleStep = 0.05
-        self.FifthEVSlider.tickInterval = 0.1
-        self.FifthEVSlider.decimals = 2
-        self.FifthEVSlider.connect('valueChanged(double)', self.onFifthEVSliderChange)
-        self.Model_Sliders_FormLayout.addRow(self.label, self.FifthEVSlider)        
+        self.FifthEVSlider = self.Create_Slider(self.Model_Sliders_FormLayout, "5th Coefficent: ", tooltip, -self.slider_range, self.slider_range, 0, 0.05, 0.1, 2, self.onFifthEVSliderChange)
         self.FifthEV = self.FifthEVSlider.value # Set default value
+
+        # Show a decimated preview of the model while one of the model coefficient sliders is being dragged
+        # and the full resolution model once it is released
+        for slider in (self.FirstEVSlider, self.SecondEVSlider, self.ThirdEVSlider, self.FourthEVSlider, self.FifthEVSlider):
+            slider.slider().connect('sliderPressed()', self.onSliderPressed)
+            slider.slider().connect('sliderReleased()', self.onEVSliderReleased)
         
         # Reset model coefficient sliders button
         self.resetButton = qt.QPushButton("Reset Model Coefficient Sliders")
-        self.resetButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.resetButton.setFont(self.font)
         self.resetButton.toolTip = "Reset all the model coefficient selection sliders back to all zeros."
         self.Model_Sliders_FormLayout.addWidget(self.resetButton)
         self.resetButton.connect('clicked()', self.onResetButton)
 
         # Model Coefficent Fitting and Interpolation Collapse button
         self.Model_Fitting_CollapsibleButton = ctk.ctkCollapsibleButton()
-        self.Model_Fitting_CollapsibleButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.Model_Fitting_CollapsibleButton.setFont(self.font)
         self.Model_Fitting_CollapsibleButton.text = "Model Coefficent Fitting and Interpolation"
         self.Model_Fitting_CollapsibleButton.collapsed = True # Default is to not show     
         frameLayout.addWidget(self.Model_Fitting_CollapsibleButton) 
@@ -272,79 +301,55 @@ class PCA_KinematicsWidget:
 
         # Choose a folder of surfaces in correspondence to fit the model to
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("Surfaces to Fit: ")
         tooltip = "Fit the constructed bone displacement model to each surface within a folder of surfaces. Note that these surfaces must be in correspondence with the bone displacement model surface."
         self.label.setToolTip(tooltip)   
         self.directorySurfaceFittingButton = qt.QPushButton("Choose Input Folder")
-        self.directorySurfaceFittingButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.directorySurfaceFittingButton.setFont(self.font)
         self.directorySurfaceFittingButton.setToolTip(tooltip)
         self.Eigenvalue_Fitting_FormLayout.addRow(self.label, self.directorySurfaceFittingButton)      
         self.directorySurfaceFittingButton.connect('clicked()', self.onDirectorySurfaceFittingButtonClick)
 
         # Choose a folder to output the resulting text file to (containing the fitted model coefficients)
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("Output Folder: ")
         tooltip = "Choose a folder to save the resulting text files to (which contain a list of the filenames fitted and the resulting model coefficients)."
         self.label.setToolTip(tooltip)
         self.directoryFittingOutputButton = qt.QPushButton("Choose Output Folder")
-        self.directoryFittingOutputButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.directoryFittingOutputButton.setFont(self.font)
         self.directoryFittingOutputButton.setToolTip(tooltip)
         self.Eigenvalue_Fitting_FormLayout.addRow(self.label, self.directoryFittingOutputButton)        
         self.directoryFittingOutputButton.connect('clicked()', self.onDirectoryFittingOutputButtonClick)           
 
         # Button to run the fitting procedure on the surfaces in correspondence
         self.PCAFittingButton = qt.QPushButton("Run Fitting Procedure")
-        self.PCAFittingButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.PCAFittingButton.setFont(self.font)
         self.PCAFittingButton.toolTip = "Find the eigenvalue coefficients of the surfaces in correspondence \
         which are located in the above folder. Then save the coefficients to a text file."
         self.Eigenvalue_Fitting_FormLayout.addWidget(self.PCAFittingButton)
         self.PCAFittingButton.connect('clicked()', self.onPCAFittingButtonClicked)
 
         # Slider to vary TIME instead of eigenvalue scaling on the fitted coefficients
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("Time Slider:")
         tooltip = "Fit a curve to the eigenvalue scaling at the positions in the above folder and select the time point by varying multiple model coefficients at once."
-        self.label.setToolTip(tooltip)
-        self.TimeSelectSlider_Fitted = ctk.ctkSliderWidget()
-        self.TimeSelectSlider_Fitted.setFont(qt.QFont(self.font_type, self.font_size))
-        self.TimeSelectSlider_Fitted.setToolTip(tooltip)
-        self.TimeSelectSlider_Fitted.minimum = -1
-        self.TimeSelectSlider_Fitted.maximum = 1
-        self.TimeSelectSlider_Fitted.value = 0
-        self.TimeSelectSlider_Fitted.singleStep = 0.1
-        self.TimeSelectSlider_Fitted.tickInterval = 0.1
-        self.TimeSelectSlider_Fitted.decimals = 2
-        self.TimeSelectSlider_Fitted.connect('valueChanged(double)', self.onTimeSelectSlider_FittedChange)
-        self.Eigenvalue_Fitting_FormLayout.addRow(self.label, self.TimeSelectSlider_Fitted)        
+        self.TimeSelectSlider_Fitted = self.Create_Slider(self.Eigenvalue_Fitting_FormLayout, "Time Slider:", tooltip, -1, 1, 0, 0.1, 0.1, 2, self.onTimeSelectSlider_FittedChange)
         self.TimeSelected_Fitted = self.TimeSelectSlider_Fitted.value # Set default value
 
+        # Show a decimated preview of the model while the time slider is being dragged
+        self.TimeSelectSlider_Fitted.slider().connect('sliderPressed()', self.onSliderPressed)
+        self.TimeSelectSlider_Fitted.slider().connect('sliderReleased()', self.onTimeSelectSlider_FittedReleased)
+
         # Slider to select the polynomial order of the fitting of the eigenvalues
         # This is the second slider of this type and is used for interpolating between
         # The positions in the above folder (as opposed to using the table of values)
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("Fitting Order:")
         tooltip = "Choose the order of the fitting. 1 = linear, 2 = 2nd order, etc."
-        self.label.setToolTip(tooltip)
-        self.FittingOrderSlider_Fitted = ctk.ctkSliderWidget()
-        self.FittingOrderSlider_Fitted.setFont(qt.QFont(self.font_type, self.font_size))
-        self.FittingOrderSlider_Fitted.setToolTip(tooltip)
-        self.FittingOrderSlider_Fitted.minimum = 1
-        self.FittingOrderSlider_Fitted.maximum = 5
-        self.FittingOrderSlider_Fitted.value = 1
-        self.FittingOrderSlider_Fitted.singleStep = 1
-        self.FittingOrderSlider_Fitted.tickInterval = 1
-        self.FittingOrderSlider_Fitted.decimals = 0
-        self.FittingOrderSlider_Fitted.connect('valueChanged(double)', self.onFittingOrderSlider_FittedChange)
-        self.Eigenvalue_Fitting_FormLayout.addRow(self.label, self.FittingOrderSlider_Fitted)        
+        self.FittingOrderSlider_Fitted = self.Create_Slider(self.Eigenvalue_Fitting_FormLayout, "Fitting Order:", tooltip, 1, 5, 1, 1, 1, 0, self.onFittingOrderSlider_FittedChange)
         self.FittingOrder_Fitted = self.FittingOrderSlider_Fitted.value # Set default value
 
         # Rendering Options Collapse button
         self.Rendering_Options_CollapsibleButton = ctk.ctkCollapsibleButton()
-        self.Rendering_Options_CollapsibleButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.Rendering_Options_CollapsibleButton.setFont(self.font)
         self.Rendering_Options_CollapsibleButton.text = "Rendering Options"
         self.Rendering_Options_CollapsibleButton.collapsed = True # Default is to not show  
         frameLayout.addWidget(self.Rendering_Options_CollapsibleButton) 
@@ -353,131 +358,75 @@ class PCA_KinematicsWidget:
         self.Rendering_Options_FormLayout = qt.QFormLayout(self.Rendering_Options_CollapsibleButton)
 
         # Slider for selecting the amount of red in the rendered surface   
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("Red: ")
         tooltip = "Select the amount of red to have in the rendered surface."
-        self.label.setToolTip(tooltip)
-        self.RedColorSlider = ctk.ctkSliderWidget()
-        self.RedColorSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.RedColorSlider.setToolTip(tooltip)
-        self.RedColorSlider.minimum = 0
-        self.RedColorSlider.maximum = 1
-        self.RedColorSlider.value = 0.8
-        self.RedColorSlider.singleStep = 0.01
-        self.RedColorSlider.tickInterval = 0.01
-        self.RedColorSlider.decimals = 2
-        self.RedColorSlider.connect('valueChanged(double)', self.onRedColorSliderChange)
-        self.Rendering_Options_FormLayout.addRow(self.label, self.RedColorSlider)        
+        self.RedColorSlider = self.Create_Slider(self.Rendering_Options_FormLayout, "Red: ", tooltip, 0, 1, 0.8, 0.01, 0.01, 2, self.onRedColorSliderChange)
         self.RedColor = self.RedColorSlider.value # Set default value
 
         # Slider for selecting the amount of green in the rendered surface     
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("Green: ")
         tooltip = "Select the amount of green to have in the rendered surface."
-        self.label.setToolTip(tooltip)
-        self.GreenColorSlider = ctk.ctkSliderWidget()
-        self.GreenColorSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.GreenColorSlider.setToolTip(tooltip)
-        self.GreenColorSlider.minimum = 0
-        self.GreenColorSlider.maximum = 1
-        self.GreenColorSlider.value = 0.8
-        self.GreenColorSlider.singleStep = 0.01
-        self.GreenColorSlider.tickInterval = 0.01
-        self.GreenColorSlider.decimals = 2
-        self.GreenColorSlider.connect('valueChanged(double)', self.onGreenColorSliderChange)
-        self.Rendering_Options_FormLayout.addRow(self.label, self.GreenColorSlider)        
+        self.GreenColorSlider = self.Create_Slider(self.Rendering_Options_FormLayout, "Green: ", tooltip, 0, 1, 0.8, 0.01, 0.01, 2, self.onGreenColorSliderChange)
         self.GreenColor = self.GreenColorSlider.value # Set default value
 
         # Slider for selecting the amount of blue in the rendered surface   
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("Blue: ")
         tooltip = "Select the amount of blue to have in the rendered surface."
-        self.label.setToolTip(tooltip)
-        self.BlueColorSlider = ctk.ctkSliderWidget()
-        self.BlueColorSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.BlueColorSlider.setToolTip(tooltip)
-        self.BlueColorSlider.minimum = 0
-        self.BlueColorSlider.maximum = 1
-        self.BlueColorSlider.value = 0.8
-        self.BlueColorSlider.singleStep = 0.01
-        self.BlueColorSlider.tickInterval = 0.01
-        self.BlueColorSlider.decimals = 2
-        self.BlueColorSlider.connect('valueChanged(double)', self.onBlueColorSliderChange)
-        self.Rendering_Options_FormLayout.addRow(self.label, self.BlueColorSlider)        
+        self.BlueColorSlider = self.Create_Slider(self.Rendering_Options_FormLayout, "Blue: ", tooltip, 0, 1, 0.8, 0.01, 0.01, 2, self.onBlueColorSliderChange)
         self.BlueColor = self.BlueColorSlider.value # Set default value
 
         # Render the surface as points
         self.represent_points = qt.QCheckBox("Render as points")
-        self.represent_points.setFont(qt.QFont(self.font_type, self.font_size))
+        self.represent_points.setFont(self.font)
         self.represent_points.toolTip = "When checked, the surface will be rendered using the points option."
         self.represent_points.checked = False
         self.Rendering_Options_FormLayout.addWidget(self.represent_points) 
-        self.represent_points.connect('clicked()', self.onCompute)
+        self.represent_points.connect('clicked()', self.onRenderOptionChange)
 
         # Render the surface as a wireframe
         self.represent_wireframe = qt.QCheckBox("Render as wireframe")
-        self.represent_wireframe.setFont(qt.QFont(self.font_type, self.font_size))
+        self.represent_wireframe.setFont(self.font)
         self.represent_wireframe.toolTip = "When checked, the surface will be rendered using the wireframe option."
         self.represent_wireframe.checked = False
         self.Rendering_Options_FormLayout.addWidget(self.represent_wireframe) 
-        self.represent_wireframe.connect('clicked()', self.onCompute)
+        self.represent_wireframe.connect('clicked()', self.onRenderOptionChange)
 
         # Render the surface as a surface
         self.represent_surface = qt.QCheckBox("Render as surface")
-        self.represent_surface.setFont(qt.QFont(self.font_type, self.font_size))
+        self.represent_surface.setFont(self.font)
         self.represent_surface.toolTip = "When checked, the surface will be rendered using the surface option."
         self.represent_surface.checked = True
         self.Rendering_Options_FormLayout.addWidget(self.represent_surface) 
-        self.represent_surface.connect('clicked()', self.onCompute)
+        self.represent_surface.connect('clicked()', self.onRenderOptionChange)
 
         # Render the surface as a surface with edges
         self.represent_surface_edges = qt.QCheckBox("Render as surface with edges")
-        self.represent_surface_edges.setFont(qt.QFont(self.font_type, self.font_size))
+        self.represent_surface_edges.setFont(self.font)
         self.represent_surface_edges.toolTip = "When checked, the surface will be rendered using the surface with edges option."
         self.represent_surface_edges.checked = False
         self.Rendering_Options_FormLayout.addWidget(self.represent_surface_edges) 
-        self.represent_surface_edges.connect('clicked()', self.onCompute)
+        self.represent_surface_edges.connect('clicked()', self.onRenderOptionChange)
 
         # Show normal vector checkmark
         self.show_glyph = qt.QCheckBox("Show Surface Normal Vectors")
-        self.show_glyph.setFont(qt.QFont(self.font_type, self.font_size))
+        self.show_glyph.setFont(self.font)
         self.show_glyph.toolTip = "When checked, the normal vector at each point on the surface will be rendered. This is useful for debugging surface mesh issues."
         self.show_glyph.checked = False
         self.Rendering_Options_FormLayout.addWidget(self.show_glyph) 
-        self.show_glyph.connect('clicked()', self.onCompute)
+        self.show_glyph.connect('clicked()', self.onRenderOptionChange)
 
         # Button for looping through the model coefficients (for visualizing)
         self.LoopCoefficientsButton = qt.QPushButton("Loop Model Coefficients")
-        self.LoopCoefficientsButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.LoopCoefficientsButton.setFont(self.font)
         self.LoopCoefficientsButton.toolTip = "Press this button to loop through the model coefficients one at a time. Useful for rendering what the model looks like."
         self.Rendering_Options_FormLayout.addWidget(self.LoopCoefficientsButton)
         self.LoopCoefficientsButton.connect('clicked()', self.onLoopCoefficientsButton)
 
         # Slider for selecting step size for the model coefficient looping 
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("Coefficent Looping Step Size: ")
         tooltip = "Select the step size for the coefficient looping. A smaller step size will take longer but will be smoother."
-        self.label.setToolTip(tooltip)
-        self.LoopStepSizeSlider = ctk.ctkSliderWidget()
-        self.LoopStepSizeSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.LoopStepSizeSlider.setToolTip(tooltip)
-        self.LoopStepSizeSlider.minimum = 1
-        self.LoopStepSizeSlider.maximum = 50
-        self.LoopStepSizeSlider.value = 25
-        self.LoopStepSizeSlider.singleStep = 1
-        self.LoopStepSizeSlider.tickInterval = 1
-        self.LoopStepSizeSlider.decimals = 0
-        self.LoopStepSizeSlider.connect('valueChanged(double)', self.onLoopStepSizeSliderChange)
-        self.Rendering_Options_FormLayout.addRow(self.label, self.LoopStepSizeSlider)        
+        self.LoopStepSizeSlider = self.Create_Slider(self.Rendering_Options_FormLayout, "Coefficent Looping Step Size: ", tooltip, 1, 50, 25, 1, 1, 0, self.onLoopStepSizeSliderChange)
         self.loop_coefficients_num_steps = self.LoopStepSizeSlider.value # Set default value
 
         # Debug Options Collapse button
         self.Debug_Options_CollapsibleButton = ctk.ctkCollapsibleButton()
-        self.Debug_Options_CollapsibleButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.Debug_Options_CollapsibleButton.setFont(self.font)
         self.Debug_Options_CollapsibleButton.text = "Debug"
         self.Debug_Options_CollapsibleButton.collapsed = True # Default is to not show     
         frameLayout.addWidget(self.Debug_Options_CollapsibleButton) 
@@ -486,27 +435,13 @@ class PCA_KinematicsWidget:
         self.Debug_Options_FormLayout = qt.QFormLayout(self.Debug_Options_CollapsibleButton)
       
         # Slider for selecting model coefficient slider range     
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("Select Coefficent Slider Range: ")
         tooltip = "Select the range of the model coefficient sliders (i.e. the 5 sliders at the top of the module)."
-        self.label.setToolTip(tooltip)
-        self.CoefficentRangeSlider = ctk.ctkSliderWidget()
-        self.CoefficentRangeSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.CoefficentRangeSlider.setToolTip(tooltip)
-        self.CoefficentRangeSlider.minimum = 0.1
-        self.CoefficentRangeSlider.maximum = 10
-        self.CoefficentRangeSlider.value = 1
-        self.CoefficentRangeSlider.singleStep = 0.1
-        self.CoefficentRangeSlider.tickInterval = 0.05
-        self.CoefficentRangeSlider.decimals = 2
-        self.CoefficentRangeSlider.connect('valueChanged(double)', self.onCoefficentRangeSliderChange)
-        self.Debug_Options_FormLayout.addRow(self.label, self.CoefficentRangeSlider)        
+        self.CoefficentRangeSlider = self.Create_Slider(self.Debug_Options_FormLayout, "Select Coefficent Slider Range: ", tooltip, 0.1, 10, 1, 0.1, 0.05, 2, self.onCoefficentRangeSliderChange)
         self.slider_range = self.CoefficentRangeSlider.value # Set default value
 
         # Experimental Options Collapse button
         self.Experimental_Options_CollapsibleButton = ctk.ctkCollapsibleButton()
-        self.Experimental_Options_CollapsibleButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.Experimental_Options_CollapsibleButton.setFont(self.font)
         self.Experimental_Options_CollapsibleButton.text = "Experimental"
         self.Experimental_Options_CollapsibleButton.collapsed = True # Default is to not show     
         frameLayout.addWidget(self.Experimental_Options_CollapsibleButton) 
@@ -529,61 +464,60 @@ class PCA_KinematicsWidget:
 
         # Fit the PCA model to an image
         self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
+        self.label.setFont(self.font)
         self.label.setText("Run Fitting")
         tooltip = "Fit the PCA model to an image by projecting nearby landmarks onto the PCA model."
         self.label.setToolTip(tooltip)
         self.runFittingButton = qt.QPushButton("Start Segmentation")
-        self.runFittingButton.setFont(qt.QFont(self.font_type, self.font_size))
+        self.runFittingButton.setFont(self.font)
         self.runFittingButton.setToolTip(tooltip)
         self.Experimental_Options_FormLayout.addRow(self.label, self.runFittingButton)        
         self.runFittingButton.connect('clicked()', self.onFitToImageClicked)        
 
         # Slider for selecting the number of iterations for fitting the model to the image
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("Fitting Iterations: ")
         tooltip = "Select the number of iterations to use when fitting the model to the image."
-        self.label.setToolTip(tooltip)
-        self.FittingItsSlider = ctk.ctkSliderWidget()
-        self.FittingItsSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.FittingItsSlider.setToolTip(tooltip)
-        self.FittingItsSlider.minimum = 1
-        self.FittingItsSlider.maximum = 50
-        self.FittingItsSlider.value = 15
-        self.FittingItsSlider.singleStep = 1
-        self.FittingItsSlider.tickInterval = 1
-        self.FittingItsSlider.decimals = 0
-        self.FittingItsSlider.connect('valueChanged(double)', self.onFittingItsSliderChange)
-        self.Experimental_Options_FormLayout.addRow(self.label, self.FittingItsSlider)        
+        self.FittingItsSlider = self.Create_Slider(self.Experimental_Options_FormLayout, "Fitting Iterations: ", tooltip, 1, 50, 15, 1, 1, 0, self.onFittingItsSliderChange)
         self.FittingIts = self.FittingItsSlider.value # Set default value
 
         # Slider for selecting the search space when fitting the model to the image
-        self.label = qt.QLabel()
-        self.label.setFont(qt.QFont(self.font_type, self.font_size))
-        self.label.setText("Search Space: ")
         tooltip = "Select the search space when fitting the model to the image."
-        self.label.setToolTip(tooltip)
-        self.SearchSpaceSlider = ctk.ctkSliderWidget()
-        self.SearchSpaceSlider.setFont(qt.QFont(self.font_type, self.font_size))
-        self.SearchSpaceSlider.setToolTip(tooltip)
-        self.SearchSpaceSlider.minimum = 1
-        self.SearchSpaceSlider.maximum = 50
-        self.SearchSpaceSlider.value = 15
-        self.SearchSpaceSlider.singleStep = 0.1
-        self.SearchSpaceSlider.tickInterval = 0.1
-        self.SearchSpaceSlider.decimals = 1
-        self.SearchSpaceSlider.connect('valueChanged(double)', self.onSearchSpaceSliderChange)
-        self.Experimental_Options_FormLayout.addRow(self.label, self.SearchSpaceSlider)        
+        self.SearchSpaceSlider = self.Create_Slider(self.Experimental_Options_FormLayout, "Search Space: ", tooltip, 1, 50, 15, 0.1, 0.1, 1, self.onSearchSpaceSliderChange)
         self.SearchSpace = self.SearchSpaceSlider.value # Set default value
 
         # Progress Bar (so the user knows how much longer the computation will likely take)
         self.progressBar = qt.QProgressBar()
-        self.progressBar.setFont(qt.QFont(self.font_type, self.font_size))
+        self.progressBar.setFont(self.font)
         self.progressBar.setValue(0)
         frameLayout.addWidget(self.progressBar)
         self.progressBar.hide()  
 
+        # Add the frame to the module panel now that all of its widgets are created
+        frame.setUpdatesEnabled(True)
+        self.parent.layout().addWidget(frame)
+
+
+    def Create_Slider(self, layout, label_text, tooltip, minimum, maximum, value, single_step, tick_interval, decimals, callback):
+        # Create a label and a ctkSliderWidget with the given settings and add them as a row of the layout
+        # Returns the slider
+
+        label = qt.QLabel()
+        label.setFont(self.font)
+        label.setText(label_text)
+        label.setToolTip(tooltip)
+
+        slider = ctk.ctkSliderWidget()
+        slider.setFont(self.font)
+        slider.setToolTip(tooltip)
+        slider.minimum = minimum
+        slider.maximum = maximum
+        slider.value = value
+        slider.singleStep = single_step
+        slider.tickInterval = tick_interval
+        slider.decimals = decimals
+        slider.connect('valueChanged(double)', callback)
+        layout.addRow(label, slider)
+
+        return slider
 
     def onSearchSpaceSliderChange(self, newValue):  
         self.SearchSpace = newValue
@@ -615,135 +549,149 @@ class PCA_KinematicsWidget:
     def onRedColorSliderChange(self, newValue):
         self.RedColor = newValue
 
-        # Run the onCompute function to update the current rendering
-        self.onCompute()
+        # Update the color of the model nodes once the slider stops moving (the model itself doesn't change)
+        self.Color_Timer.start()
 
     def onGreenColorSliderChange(self, newValue):
         self.GreenColor = newValue
 
-        # Run the onCompute function to update the current rendering
-        self.onCompute()
+        # Update the color of the model nodes once the slider stops moving (the model itself doesn't change)
+        self.Color_Timer.start()
 
     def onBlueColorSliderChange(self, newValue):
         self.BlueColor = newValue
 
-        # Run the onCompute function to update the current rendering
-        self.onCompute()
+        # Update the color of the model nodes once the slider stops moving (the model itself doesn't change)
+        self.Color_Timer.start()
+
+    def onRenderOptionChange(self):
+        # The rendering options don't change the model so just render the current instance of the model again
+        # (only run onCompute() if the model still needs to be created)
+        if self.pca_model == [] or self.New_Folder_Selected == True:
+            self.onCompute()
+        else:
+            self.Render_Surface(self.output_shape)
 
     def CreateGlyphs(self, polydata, flipNormals):
         # Create vectors normal to the surface at each point
         # The vectors are called Glyphs
         # To flip the orientation set flipNormals to True or False
 
+        # The glyph pipeline is created once in __init__() so only the inputs are changed here
+        # The output of the glyph filter is the same polydata each time
+
         # Compute the normal to the polydata surface
-        normals = vtk.vtkPolyDataNormals()
+        if polydata.GetPolys().GetMaxCellSize() <= 3:
+            # The model surface is a triangle mesh with a consistent orientation (from the training data)
+            # so use the much faster triangle mesh normals (no orientation checks or splitting of sharp edges)
+            # These normals are not flipped so only reverse them if they should be flipped
+            normals = self.Glyph_Triangle_Normals
+            reverse_normals = not flipNormals
+        else:
+            normals = self.Glyph_Normals
+            reverse_normals = flipNormals
         normals.SetInputData(polydata)
-        normals.FlipNormalsOn()
-        normals.SetFeatureAngle(60.0)
-        normals.Update()
-        polydata = normals.GetOutput()
 
-        # vtkReverseSense is used to flip the vector 
-        reverse = vtk.vtkReverseSense()
-
-        # Choose a random subset of points.
-        maskPts = vtk.vtkMaskPoints()
-        maskPts.SetOnRatio(1)
-        maskPts.RandomModeOn()
-
-        if flipNormals:
-            reverse.SetInputData(polydata)
-            reverse.ReverseCellsOn()
-            reverse.ReverseNormalsOn()
-            maskPts.SetInputConnection(reverse.GetOutputPort())
+        if reverse_normals:
+            self.Glyph_Reverse.SetInputConnection(normals.GetOutputPort())
+            self.Glyph_Mask.SetInputConnection(self.Glyph_Reverse.GetOutputPort())
         else:
-            maskPts.SetInputData(polydata)
+            self.Glyph_Mask.SetInputConnection(normals.GetOutputPort())
 
-        # Source for the glyph filter
-        arrow = vtk.vtkArrowSource()
-        arrow.SetTipResolution(4) # 16
-        arrow.SetTipLength(0.05) # 0.3
-        arrow.SetTipRadius(0.05) # 0.1
-
-        glyph = vtk.vtkGlyph3D()
-        glyph.SetSourceConnection(arrow.GetOutputPort())
-        glyph.SetInputConnection(maskPts.GetOutputPort())
-        glyph.SetVectorModeToUseNormal()
-        glyph.SetScaleFactor(1) # 1
-        glyph.SetColorModeToColorByVector()
-        glyph.SetScaleModeToScaleByVector()
-        glyph.OrientOn()
-        glyph.Update()
-
-        return glyph
+        # Use the same evenly spaced subset of points for each instance of the model
+        # (a random subset would make the glyphs jump around when the sliders are moved)
+        num_points = polydata.GetNumberOfPoints()
+        self.Glyph_Mask.SetOnRatio(max(1, -(-num_points // self.Glyph_Max_Points)))
+
+        self.Glyph_Filter.Update()
+
+        return self.Glyph_Filter
 
     def onResetButton(self):
         # Reset all the model coefficient selection sliders back to zero
         
-        # Prevent the autorun (since the sliders are resetting)
-        self.reseting_state = True
-
         # Reset all the sliders back to zero
-        self.FirstEVSlider.value  = 0
-        self.SecondEVSlider.value = 0
-        self.ThirdEVSlider.value  = 0
-        self.FourthEVSlider.value = 0
-        self.FifthEVSlider.value  = 0
-
-        # Set the reseting flag back to false now (if needed)
-        self.reseting_state = False
+        # The model is only updated once at the end instead of once for each slider
+        self.Set_Model_Coefficient_Sliders([0, 0, 0, 0, 0])
 
         self.FittingTransform.Identity()
         
         # Rebuild the model and create a new instance using the new EVs
         self.onCompute()
 
+    def Set_Model_Coefficient_Sliders(self, values):
+        # Set the five model coefficient sliders to the given values without updating the model for each slider
+        # blockSignals() stops the valueChanged() signals of the sliders so the slider callbacks don't run
+        # and the model coefficients are saved here instead
+
+        sliders = (self.FirstEVSlider, self.SecondEVSlider, self.ThirdEVSlider, self.FourthEVSlider, self.FifthEVSlider)
+
+        for slider in sliders:
+            slider.blockSignals(True)
+
+        try:
+            for slider, value in zip(sliders, values):
+                slider.value = value
+        finally:
+            # Let the sliders update the model again (even if setting a slider failed)
+            for slider in sliders:
+                slider.blockSignals(False)
+
+        # Save the values of the sliders (the same as the slider callbacks would)
+        self.FirstEV, self.SecondEV, self.ThirdEV, self.FourthEV, self.FifthEV = [slider.value for slider in sliders]
+
+    def onSliderPressed(self):
+        # Show the decimated preview while a model coefficient slider (or the time slider) is being dragged
+        self.Slider_Dragging = True
+
+    def onEVSliderReleased(self):
+        # Show the full resolution model now that the slider was released
+        self.Slider_Dragging = False
+
+        if self.pca_model != []:
+            self.Compute_Timer.start()
+
     def onFirstEVSliderChange(self, newValue):
         self.FirstEV = newValue   
 
-        if self.reseting_state == False:              
-            # Rebuild the model and create a new instance using the new EV
-            self.onCompute()
+        # Rebuild the model and create a new instance using the new EV (once the slider stops moving)
+        self.Compute_Timer.start()
 
     def onSecondEVSliderChange(self, newValue):
         self.SecondEV = newValue   
 
-        if self.reseting_state == False:
-            # Rebuild the model and create a new instance using the new EV
-            self.onCompute()
+        # Rebuild the model and create a new instance using the new EV (once the slider stops moving)
+        self.Compute_Timer.start()
 
     def onThirdEVSliderChange(self, newValue):
         self.ThirdEV = newValue 
 
-        if self.reseting_state == False:
-            # Rebuild the model and create a new instance using the new EV
-            self.onCompute()
+        # Rebuild the model and create a new instance using the new EV (once the slider stops moving)
+        self.Compute_Timer.start()
 
     def onFourthEVSliderChange(self, newValue):
         self.FourthEV = newValue 
 
-        if self.reseting_state == False:
-            # Rebuild the model and create a new instance using the new EV
-            self.onCompute()
+        # Rebuild the model and create a new instance using the new EV (once the slider stops moving)
+        self.Compute_Timer.start()
 
     def onFifthEVSliderChange(self, newValue):
         self.FifthEV = newValue 
 
-        if self.reseting_state == False:
-            # Rebuild the model and create a new instance using the new EV
-            self.onCompute()
+        # Rebuild the model and create a new instance using the new EV (once the slider stops moving)
+        self.Compute_Timer.start()
 
     def onDirectoryButtonClick(self):
         # After clicking the button, let the user choose a directory for saving
         self.directory_path = qt.QFileDialog.getExistingDirectory()
 
-        self.New_Folder_Selected = True
+        # Only create the PCA model again if the surfaces are different from the ones the current model was created from
+        # (i.e. selecting the same folder again without changing any of the files reuses the model)
+        if self.pca_model == [] or self.Get_Training_Data_Key(self.directory_path) != self.Training_Data_Key:
+            self.New_Folder_Selected = True
 
         # Update the QT label with the directory path so the user can see it
-        try:
-            self.directoryButton.setText('...' + self.directory_path[-40:]) # Only show the last 40 characters for better display in the Slicer GUI
-        except:
-            self.directoryButton.setText(self.directory_path) # Show the entire path if it is less than 40 characters long
+        self.directoryButton.setText(self.Abbreviate_Path(self.directory_path))
 
     def onDirectorySurfaceFittingButtonClick(self):
         # After clicking this button, let the user choose a directory
@@ -753,10 +701,7 @@ class PCA_KinematicsWidget:
         self.Directory_Input_Surfaces_Fitting = qt.QFileDialog.getExistingDirectory()
 
         # Update the QT label with the directory path so the user can see it
-        try:
-            self.directorySurfaceFittingButton.setText('...' + self.Directory_Input_Surfaces_Fitting[-40:]) # Only show the last 40 characters for better display in the Slicer GUI
-        except:
-            self.directorySurfaceFittingButton.setText(self.Directory_Input_Surfaces_Fitting) # Show the entire path if it is less than 40 characters long
+        self.directorySurfaceFittingButton.setText(self.Abbreviate_Path(self.Directory_Input_Surfaces_Fitting))
 
     def onDirectoryFittingOutputButtonClick(self):
         # After clicking this button, let the user choose a directory to save the outfile text files to (from the fitting procedure)
@@ -764,43 +709,26 @@ class PCA_KinematicsWidget:
         self.fitting_output_directory_path = qt.QFileDialog.getExistingDirectory()
 
         # Update the QT label with the directory path so the user can see it
-        try:
-            self.directoryFittingOutputButton.setText('...' + self.fitting_output_directory_path[-40:]) # Only show the last 40 characters for better display in the Slicer GUI
-        except:
-            self.directoryFittingOutputButton.setText(self.fitting_output_directory_path) # Show the entire path if it is less than 40 characters long
-
-    def linspace(self, start, stop, num=50, endpoint=True, retstep=False):
-        # Inspired from https:#github.com/numpy/numpy/issues/2944
-
-        import numpy.core.numeric as _nx
-
-        # just pre-process start and stop a bit:
-        start = np.asarray(start)[...,None]
-        stop = np.asarray(stop)[...,None]
-        num = int(num)
-        if num <= 0:
-            dtype = np.result_type(start, stop, 1.) # conserve dtype
-            shape = np.broadcast(start, end).shape[:-1] + (0,)
-            return np.empty(shape, dtype=dtype)
-        if endpoint:
-            if num == 1:
-                dtype = np.result_type(start, stop, 1.)
-                return start.astype(dtype)
-            step = (stop-start)/float((num-1))
-            y = _nx.arange(0, num) * step + start
-            y[...,-1] = stop[...,0]
-        else:
-            step = (stop-start)/float(num)
-            y = _nx.arange(0, num) * step + start
-        if retstep:
-            return y, step
+        self.directoryFittingOutputButton.setText(self.Abbreviate_Path(self.fitting_output_directory_path))
+
+    def Abbreviate_Path(self, path, max_length=40):
+        # Only show the last 40 characters of a long path for better display in the Slicer GUI
+        # Show the entire path if it is 40 characters or less
+        if len(path) > max_length:
+            return '...' + path[-max_length:]
         else:
-            return y
+            return path
 
     def Slicer_Landmark_To_List(self, Slicer_Landmarks):
         # Given a 3D Slicer markuplist, convert it to a Python list
 
-        # Make a Python list of all the seed point locations
+        # Newer Slicer versions can copy every control point into a vtkPoints in a single call
+        if hasattr(Slicer_Landmarks, 'GetControlPointPositionsWorld'):
+            landmarkPoints = vtk.vtkPoints()
+            Slicer_Landmarks.GetControlPointPositionsWorld(landmarkPoints)
+            return vtk_to_numpy(landmarkPoints.GetData()).tolist()
+
+        # Otherwise make a Python list of all the seed point locations one at a time
         numFids = Slicer_Landmarks.GetNumberOfFiducials()
         seedPoints = []
         # Create a list of the fiducial markers from the 'Markup List' input
@@ -811,25 +739,22 @@ class PCA_KinematicsWidget:
 
         return seedPoints
 
-    def tryint(self, s):
-        # Used with alphanum_key() function to sort the files numerically
-        try:
-            return int(s)
-        except:
-            return s
-
     def alphanum_key(self, s):
         # For sorting of the filenames to be in numerical order 
         # Turn a string into a list of string and number chunks "z23a" . ["z", 23, "a"]
-        import re
-
-        return [ self.tryint(c) for c in re.split('([0-9]+)', s) ]
+        return [ int(c) if c.isdigit() else c for c in alphanum_regex.split(s) ]
 
     def onLoopCoefficientsButton(self):
         # Loop through each of the model coefficients one at a time. Should be very useful for visualization
-        
-        print("self.loop_coefficients_num_steps")
-        print(self.loop_coefficients_num_steps)
+        # The frames are shown by a timer (about 30 frames per second) so Qt can render each frame between them
+
+        # Create the PCA model first if needed
+        if self.pca_model == [] or self.New_Folder_Selected == True:
+            self.onCompute()
+
+        # Don't start the loop if the model couldn't be created (e.g. no training data folder was selected)
+        if self.pca_model == []:
+            return
 
         # Have the values increase and then decrease again (for a better visualization)
         values_decreasing_1 = np.linspace(0, -1*self.slider_range, int(self.loop_coefficients_num_steps))
@@ -837,50 +762,59 @@ class PCA_KinematicsWidget:
         values_decreasing_2 = np.linspace(self.slider_range, 0, int(self.loop_coefficients_num_steps))
 
         # Concatinate the increasing and decreasing arrays together into a single vector
-        model_cofficient_values = np.concatenate((values_decreasing_1, values_increasing, values_decreasing_2), axis=0)
-
-        # Set the flag to hide the progress bar (for better visualization)
-        self.show_progress_bar = False
-
-        # Loop through the first 5 model coefficients
-        for i in range(0, 5):
-
-            # Set the reseting flag to true to stop onCompute() from running for each slider change
-            self.reseting_state = True
-
-            # Reset all the sliders back to zero
-            self.FirstEVSlider.value  = 0
-            self.SecondEVSlider.value = 0
-            self.ThirdEVSlider.value  = 0
-            self.FourthEVSlider.value = 0
-            self.FifthEVSlider.value  = 0
-
-            # Loop through the model coefficient values selected above
-            for j in range(0, len(model_cofficient_values)):
-                print(str(i) + str(model_cofficient_values[j]))
-
-                # Change the value of the sliders now
-                if   (i == 0):
-                    self.FirstEVSlider.value  = model_cofficient_values[j]
-                elif (i == 1):                    
-                    self.SecondEVSlider.value = model_cofficient_values[j]
-                elif (i == 2):                    
-                    self.ThirdEVSlider.value  = model_cofficient_values[j]
-                elif (i == 3):                    
-                    self.FourthEVSlider.value = model_cofficient_values[j]
-                elif (i == 4):                    
-                    self.FifthEVSlider.value  = model_cofficient_values[j]
-
-                # Set the reseting flag back to false now (if needed)
-                self.reseting_state = False
-
-                # Rebuild the model and create a new instance using the new EVs
-                self.onCompute()
+        self.Loop_Values = np.concatenate((values_decreasing_1, values_increasing, values_decreasing_2), axis=0)
 
-                slicer.app.processEvents()
+        # Start (or restart) the loop at the first frame of the first model coefficient
+        self.Loop_Coefficient = 0
+        self.Loop_Frame = 0
+        self.Loop_Timer.start()
 
-        # Flag to show the progress bar back to true
-        self.show_progress_bar = True
+    def onLoopTimeout(self):
+        # Show the next frame of the model coefficient loop (started by onLoopCoefficientsButton())
+
+        # Stop the loop if there isn't a model to show
+        if self.pca_model == []:
+            self.Loop_Timer.stop()
+            return
+
+        # Model coefficients of this frame (only the current coefficient changes)
+        params = np.zeros(5, dtype=np.float32)
+        params[self.Loop_Coefficient] = self.Loop_Values[self.Loop_Frame]
+
+        # Change the value of the sliders now (so the user can see the current value)
+        # The model is updated directly for the frame instead (without the progress bar and status messages of onCompute())
+        self.Set_Model_Coefficient_Sliders(params)
+
+        # Create a new instance using the new EVs and render it
+        self.Show_Model_Instance(params)
+
+        # Move to the next frame (or the next model coefficient) and stop after the first 5 model coefficients
+        self.Loop_Frame = self.Loop_Frame + 1
+        if self.Loop_Frame == len(self.Loop_Values):
+            self.Loop_Frame = 0
+            self.Loop_Coefficient = self.Loop_Coefficient + 1
+
+            if self.Loop_Coefficient == 5:
+                self.Loop_Timer.stop()
+
+    def Show_Model_Instance(self, params):
+        # Update the model to the given model coefficients and render it
+        # (same as onCompute() but without the checks, progress bar, and status messages)
+
+        # Only create a new instance of the model if the model coefficients or the fitting transform changed
+        # (e.g. the time slider was released at the same time point)
+        model_instance_key = (tuple(params), self.FittingTransform.GetMTime())
+        if model_instance_key != self.Model_Instance_Key:
+            self.Apply_Model_Coefficients(params, self.Model_Shape)
+
+            self.Model_Transform_Filter.Update()
+            self.output_shape = self.Model_Transform_Filter.GetOutput()
+
+            # onCompute() uses the same key so it only creates the instance for the slider values again if they are different
+            self.Model_Instance_Key = model_instance_key
+
+        # Render even if the instance didn't change since the nodes may be showing the decimated preview
+        self.Render_Surface(self.output_shape)
 
     def onCompute(self):
         # This is the main function which updates the bone displacement model
@@ -892,12 +826,13 @@ class PCA_KinematicsWidget:
             msg.setText('An input directory of training data was not provided.')
             msg.setInformativeText("Click on the Choose Training Data Folder to select the training data folder.")
             msg.setWindowTitle("Wrist PCA-Kinematics - Error")
-            msg.show()
-
-            raise ValueError('An input directory was not provided.')
+            msg.exec_()
 
             return
 
+        # Cancel any pending update from the sliders since the model is being updated now
+        self.Compute_Timer.stop()
+
         # Flag to check if OnCompute() is already running
         if self.Already_Running == True:
             # OnCompute() is already running so just return now
@@ -906,17 +841,21 @@ class PCA_KinematicsWidget:
             # If not already running (i.e. False) set the flag to true (i.e. is running)
             self.Already_Running = True
 
-        # Show the status bar
-        if (self.show_progress_bar == True):
-            self.progressBar.show()
-        else:
-            self.progressBar.hide()
-
-        slicer.app.processEvents()
+        # If the PCA model already exists only a new instance of it is needed (e.g. when a slider is moved)
+        # This is fast so the progress bar and the Qt event processing (which causes partial repaints) are skipped
+        fast_path = self.pca_model != [] and self.New_Folder_Selected == False and self.New_Transform_Selected == False
 
         # If there is no PCA model create it
         # Or if a new folder is selected create the PCA model
-        if self.pca_model == [] or self.New_Folder_Selected == True or self.New_Transform_Selected == True:
+        if not fast_path:
+
+            # Show the status bar
+            if (self.show_progress_bar == True):
+                self.progressBar.show()
+            else:
+                self.progressBar.hide()
+
+            slicer.app.processEvents()
 
             # Reset the new folder selected flag back to false
             self.New_Folder_Selected = False
@@ -924,8 +863,22 @@ class PCA_KinematicsWidget:
             # Reset the new transform selected flag back to false
             self.New_Transform_Selected = False
 
-            # Load each STL file, process it, and save to a Python list (i.e. self.polydata_list)
-            self.polydata_list, block_set = self.Load_Surface_From_Directory(self.directory_path, apply_tranform=True)
+            # Save which surfaces the model is created from
+            self.Training_Data_Key = self.Get_Training_Data_Key(self.directory_path)
+
+            # The current instance is from the previous model
+            self.Model_Instance_Key = None
+
+            # Load each STL file, process it, and save to a Python list (i.e. polydata_list)
+            polydata_list, block_set = self.Load_Surface_From_Directory(self.directory_path, apply_tranform=True)
+
+            # The surfaces can't be used for a model (the error was already shown) so stop here
+            if polydata_list is None:
+                self.Training_Data_Key = None
+                self.progressBar.hide()
+                slicer.util.showStatusMessage(" ")
+                self.Already_Running = False
+                return
 
             # Update the status bar
             # Start at 50%
@@ -934,7 +887,7 @@ class PCA_KinematicsWidget:
             slicer.util.showStatusMessage("Creating PCA Model...")
 
             # Update the number of eigenvalues to use to be the same as the number of poly_data minus one
-            self.NumEVs = len(self.polydata_list) - 1
+            self.NumEVs = len(polydata_list) - 1
 
             # PCA filter
             self.pca_model = vtk.vtkPCAAnalysisFilter()
@@ -945,67 +898,218 @@ class PCA_KinematicsWidget:
             slicer.app.processEvents()
             slicer.util.showStatusMessage("Extracting Mean Position...")
 
-            self.output_shape = vtk.vtkPolyData()
-
             try:
-                self.output_shape.DeepCopy(self.polydata_list[0])
+                self.Model_Shape.DeepCopy(polydata_list[0])
             except:
                 print('Failed! Did you select a folder containing PLY files of surfaces in correspondence?')
 
+            # Save the mean shape and the eigenvectors as numpy arrays (for creating new instances of the model)
+            self.Cache_Model_Basis()
+
+            # Create the decimated preview of the model (shown while the sliders are dragged)
+            self.Cache_Model_Preview()
+
+            # The training surfaces are not needed anymore (the filter keeps the mean shape and eigenvectors
+            # and Model_Shape has the surface connectivity) so release them instead of keeping all of them in memory
+            self.pca_model.RemoveAllInputs()
+            del polydata_list, block_set
+
         # Show the model at the specified scaling parameters
-        params = vtk.vtkFloatArray()
-        params.SetNumberOfComponents(1)
-        params.SetNumberOfTuples(5) 
-        params.SetTuple1(0,self.FirstEV)
-        params.SetTuple1(1,self.SecondEV)
-        params.SetTuple1(2,self.ThirdEV)
-        params.SetTuple1(3,self.FourthEV)
-        params.SetTuple1(4,self.FifthEV)
-
-        self.progressBar.setValue(90) 
-        slicer.app.processEvents()
-        slicer.util.showStatusMessage("Applying Model Coefficients...")
+        params = [self.FirstEV, self.SecondEV, self.ThirdEV, self.FourthEV, self.FifthEV]
 
-        self.pca_model.GetParameterisedShape(params, self.output_shape)
+        # Only create a new instance of the model if the model coefficients or the fitting transform changed
+        # (i.e. not when only the colors changed)
+        model_instance_key = (tuple(params), self.FittingTransform.GetMTime())
+
+        # If a slider is being dragged only show the decimated preview of the model
+        # The full resolution model is created once the slider is released
+        show_preview = fast_path and self.Slider_Dragging and self.Preview_Shape is not None
+        if show_preview:
+            self.Show_Model_Preview(params)
+
+        elif model_instance_key != self.Model_Instance_Key:
+
+            if not fast_path:
+                self.progressBar.setValue(90) 
+                slicer.app.processEvents()
+                slicer.util.showStatusMessage("Applying Model Coefficients...")
 
-        slicer.util.showStatusMessage("Model Coefficients Applied...")
+            self.Apply_Model_Coefficients(params, self.Model_Shape)
 
-        # Transform the vtkPolyData (used when fitting the PCA model to an image)
-        transformPolyFilter = vtk.vtkTransformPolyDataFilter()
-        transformPolyFilter.SetInputData(self.output_shape)
-        transformPolyFilter.SetTransform(self.FittingTransform)
-        transformPolyFilter.Update()
-        self.output_shape = transformPolyFilter.GetOutput()
+            # Transform the vtkPolyData (used when fitting the PCA model to an image)
+            # The output of the filter is the same polydata each time so the model nodes keep observing it
+            self.Model_Transform_Filter.Update()
+            self.output_shape = self.Model_Transform_Filter.GetOutput()
+
+            self.Model_Instance_Key = model_instance_key
 
         # Update the status bar
         # Start at 90%
-        self.progressBar.setValue(90)
-        slicer.app.processEvents()
-        slicer.util.showStatusMessage("Outputting model...")
+        if not fast_path:
+            self.progressBar.setValue(90)
+            slicer.app.processEvents()
+            slicer.util.showStatusMessage("Outputting model...")
 
         # Create model node ("Model_Result") and add to scene
-        self.Render_Surface(self.output_shape)
+        if not show_preview:
+            self.Render_Surface(self.output_shape)
 
-        # Set the status bar to 100%
-        self.progressBar.setValue(100)
+        # Update the color of the existing model nodes if it changed
+        if (self.RedColor, self.GreenColor, self.BlueColor) != self.Model_Colors:
+            self.Apply_Model_Colors()
 
-        # Hide the status bar
-        self.progressBar.hide() 
+        if not fast_path:
+            # Set the status bar to 100%
+            self.progressBar.setValue(100)
 
-        # Reset the status message on bottom of 3D Slicer
-        slicer.util.showStatusMessage(" ")
+            # Hide the status bar
+            self.progressBar.hide() 
+
+            # Reset the status message on bottom of 3D Slicer
+            slicer.util.showStatusMessage(" ")
 
         # Reset the already running flag back to false
         self.Already_Running = False
 
+    def Cache_Model_Basis(self):
+        # Save the mean shape and the eigenvectors of the PCA model as float32 numpy arrays
+        # The eigenvectors are scaled by the square root of their eigenvalues (same as GetParameterisedShape() of the vtkPCAAnalysisFilter)
+        # so a new instance of the model is just the mean shape plus a single matrix-vector product
+
+        # GetParameterisedShape() without any model coefficients gives the mean shape
+        no_params = vtk.vtkFloatArray()
+        no_params.SetNumberOfComponents(1)
+        no_params.SetNumberOfTuples(0)
+        mean_shape = vtk.vtkPolyData()
+        mean_shape.DeepCopy(self.Model_Shape)
+        self.pca_model.GetParameterisedShape(no_params, mean_shape)
+        self.Model_Mean = vtk_to_numpy(mean_shape.GetPoints().GetData()).astype(np.float32).ravel()
+
+        # The first five eigenvectors are used by the model coefficient sliders
+        # The fitted coefficients (for the time slider) can use all of the eigenvectors so save all of them
+        evals = vtk_to_numpy(self.pca_model.GetEvals())
+        num_modes = len(evals)
+        self.Model_Evals = evals.astype(np.float64)
+
+        # Each column is one eigenvector (x, y, z of every point)
+        # Use Fortran (column major) order so each eigenvector is contiguous in memory and the
+        # matrix-vector products (using the first few columns) run over the long axis without any copies
+        self.Model_Basis = np.empty((len(self.Model_Mean), num_modes), dtype=np.float32, order='F')
+        for i in range(0, num_modes):
+            eigenvector = vtk_to_numpy(self.pca_model.GetOutput().GetBlock(i).GetPoints().GetData()).ravel()
+            self.Model_Basis[:,i] = np.sqrt(evals[i]) * eigenvector
+
+    def Cache_Model_Preview(self):
+        # Create a decimated copy of the mean shape for previewing the model while the sliders are dragged
+        # vtkDecimatePro only removes points (the remaining points aren't moved) so each instance of the preview
+        # is the same subset of the points of the full resolution model
+
+        # Label each point with its index so the points kept by the decimation can be found
+        mean_shape = vtk.vtkPolyData()
+        mean_shape.CopyStructure(self.Model_Shape)
+        mean_points = vtk.vtkPoints()
+        mean_points.SetData(numpy_to_vtk(self.Model_Mean.reshape(-1, 3), deep=1, array_type=vtk.VTK_FLOAT))
+        mean_shape.SetPoints(mean_points)
+        point_ids = numpy_to_vtk(np.arange(mean_shape.GetNumberOfPoints(), dtype=np.int32), deep=1)
+        point_ids.SetName('Point_Ids')
+        mean_shape.GetPointData().AddArray(point_ids)
+
+        # Remove about 90% of the triangles
+        decimate = vtk.vtkDecimatePro()
+        decimate.SetInputData(mean_shape)
+        decimate.SetTargetReduction(0.9)
+        decimate.PreserveTopologyOn()
+        decimate.Update()
+
+        self.Preview_Point_Ids = vtk_to_numpy(decimate.GetOutput().GetPointData().GetArray('Point_Ids')).copy()
+
+        # Mean shape and the eigenvectors for only the points of the preview
+        num_modes = self.Model_Basis.shape[1]
+        self.Preview_Mean = self.Model_Mean.reshape(-1, 3)[self.Preview_Point_Ids].ravel()
+        self.Preview_Basis = np.asfortranarray(self.Model_Basis.reshape(-1, 3, num_modes)[self.Preview_Point_Ids].reshape(-1, num_modes))
+
+        # The preview polydata only needs the triangles (its points are created in Show_Model_Preview())
+        self.Preview_Shape = vtk.vtkPolyData()
+        self.Preview_Shape.SetPolys(decimate.GetOutput().GetPolys())
+        self.Preview_Points = np.empty((len(self.Preview_Point_Ids), 3), dtype=np.float32)
+        self.Preview_VTK_Points = vtk.vtkPoints()
+        self.Preview_VTK_Points.SetData(numpy_to_vtk(self.Preview_Points, deep=0, array_type=vtk.VTK_FLOAT))
+        self.Preview_Shape.SetPoints(self.Preview_VTK_Points)
+        self.Preview_Transform_Filter.SetInputData(self.Preview_Shape)
+
+    def Show_Model_Preview(self, params):
+        # Update the decimated preview to the given model coefficients and render it
+        # Same as Apply_Model_Coefficients() but for the points of the preview
+
+        num_modes = min(len(params), self.Preview_Basis.shape[1])
+        params = np.asarray(params[:num_modes], dtype=np.float32)
+
+        preview_points = self.Preview_Points.reshape(-1)
+        np.dot(self.Preview_Basis[:,:num_modes], params, out=preview_points)
+        np.add(preview_points, self.Preview_Mean, out=preview_points)
+        self.Preview_VTK_Points.Modified()
+        self.Preview_Shape.Modified()
+
+        self.Preview_Transform_Filter.Update()
+        self.Render_Surface(self.Preview_Transform_Filter.GetOutput())
+
+    def Apply_Model_Coefficients(self, params, polydata):
+        # Update the points of the polydata to the instance of the PCA model given by the model coefficients (params)
+        # Uses the mean shape and eigenvectors saved by Cache_Model_Basis() instead of GetParameterisedShape()
+
+        # Only use as many eigenvectors as there are model coefficients
+        num_modes = min(len(params), self.Model_Basis.shape[1])
+        params = np.asarray(params[:num_modes], dtype=np.float32)
+
+        # Only create the array of points (and the vtkPoints using it) once for the model
+        # Keep a reference to the numpy array since the vtkPoints uses its memory directly (i.e. no copy)
+        if self.Model_Points is None or self.Model_Points.size != self.Model_Mean.size:
+            self.Model_Points = np.empty((self.Model_Mean.size // 3, 3), dtype=np.float32)
+            self.Model_VTK_Points = vtk.vtkPoints()
+            self.Model_VTK_Points.SetData(numpy_to_vtk(self.Model_Points, deep=0, array_type=vtk.VTK_FLOAT))
+
+        # Write the new instance of the model directly into the points (mean shape plus the weighted eigenvectors)
+        model_points = self.Model_Points.reshape(-1)
+        np.dot(self.Model_Basis[:,:num_modes], params, out=model_points)
+        np.add(model_points, self.Model_Mean, out=model_points)
+        self.Model_VTK_Points.Modified()
+
+        if polydata.GetPoints() is not self.Model_VTK_Points:
+            polydata.SetPoints(self.Model_VTK_Points)
+        polydata.Modified()
+
+    def Apply_Model_Colors(self):
+        # Set the color of the existing model nodes to the current color slider values
+        # Only the display nodes change so the model doesn't need to be created again
+
+        for name in ('Model_points', 'Model_wireframe', 'Model_surface'):
+            Model_Result = self.Get_Model_Node(name)
+            if Model_Result is not None and Model_Result.GetDisplayNode() is not None:
+                Model_Result.GetDisplayNode().SetColor(self.RedColor, self.GreenColor, self.BlueColor)
+
+        self.Model_Colors = (self.RedColor, self.GreenColor, self.BlueColor)
+
+    def Get_Model_Node(self, name):
+        # Return the model node with the given name (or None if it isn't in the scene)
+        # The nodes are saved so the scene only needs to be searched the first time (or if the node was deleted)
+
+        Model_Result = self.Model_Nodes.get(name)
+        if Model_Result is None or Model_Result.GetScene() is None:
+            Model_Result = slicer.mrmlScene.GetFirstNodeByName(name)
+            self.Model_Nodes[name] = Model_Result
+
+        return Model_Result
+
     def Render_Surface(self, polydata):
         # Push the given polydata to the 3D Slicer scene
 
         if self.represent_points.checked == True:
-            try:
-                Model_Result = slicer.util.getNode('Model_points')
-                Model_Result.SetAndObservePolyData(polydata)
-            except:
+            Model_Result = self.Get_Model_Node('Model_points')
+            if Model_Result is not None:
+                # The same polydata is updated in place for each new model instance so only observe it again if it is a different one
+                if Model_Result.GetPolyData() is not polydata:
+                    Model_Result.SetAndObservePolyData(polydata)
+            else:
                 Model_Result = slicer.vtkMRMLModelNode()
                 Model_Result.SetAndObservePolyData(polydata)
                 Model_Result.SetName('Model_points')
@@ -1024,10 +1128,12 @@ class PCA_KinematicsWidget:
                 slicer.mrmlScene.AddNode(Model_Result) 
 
         if self.represent_wireframe.checked == True:
-            try:
-                Model_Result = slicer.util.getNode('Model_wireframe')
-                Model_Result.SetAndObservePolyData(polydata)
-            except:
+            Model_Result = self.Get_Model_Node('Model_wireframe')
+            if Model_Result is not None:
+                # The same polydata is updated in place for each new model instance so only observe it again if it is a different one
+                if Model_Result.GetPolyData() is not polydata:
+                    Model_Result.SetAndObservePolyData(polydata)
+            else:
 
                 Model_Result = slicer.vtkMRMLModelNode()
                 Model_Result.SetAndObservePolyData(polydata)
@@ -1047,10 +1153,12 @@ class PCA_KinematicsWidget:
                 slicer.mrmlScene.AddNode(Model_Result) 
 
         if self.represent_surface.checked == True:
-            try:
-                Model_Result = slicer.util.getNode('Model_surface')
-                Model_Result.SetAndObservePolyData(polydata)
-            except:
+            Model_Result = self.Get_Model_Node('Model_surface')
+            if Model_Result is not None:
+                # The same polydata is updated in place for each new model instance so only observe it again if it is a different one
+                if Model_Result.GetPolyData() is not polydata:
+                    Model_Result.SetAndObservePolyData(polydata)
+            else:
                 Model_Result = slicer.vtkMRMLModelNode()
                 Model_Result.SetAndObservePolyData(polydata)
                 Model_Result.SetName('Model_surface')
@@ -1069,10 +1177,12 @@ class PCA_KinematicsWidget:
                 slicer.mrmlScene.AddNode(Model_Result) 
 
         if self.represent_surface_edges.checked == True:
-            try:
-                Model_Result = slicer.util.getNode('Model_surface')
-                Model_Result.SetAndObservePolyData(polydata)
-            except:
+            Model_Result = self.Get_Model_Node('Model_surface')
+            if Model_Result is not None:
+                # The same polydata is updated in place for each new model instance so only observe it again if it is a different one
+                if Model_Result.GetPolyData() is not polydata:
+                    Model_Result.SetAndObservePolyData(polydata)
+            else:
                 Model_Result = slicer.vtkMRMLModelNode()
                 Model_Result.SetAndObservePolyData(polydata)
                 Model_Result.SetName('Model_surface')
@@ -1093,12 +1203,14 @@ class PCA_KinematicsWidget:
 
         # Show a vector (i.e. glyph) of the normal at each point along the surface
         if self.show_glyph.checked == True:
-            try:
-                Model_Result = slicer.util.getNode('Normal_Vectors')
+            Model_Result = self.Get_Model_Node('Normal_Vectors')
+            if Model_Result is not None:
                 glyph = self.CreateGlyphs(polydata, True)
-                Model_Result.SetAndObservePolyData(glyph.GetOutput())
+                # The glyph filter output is the same polydata each time so only observe it again if it is a different one
+                if Model_Result.GetPolyData() is not glyph.GetOutput():
+                    Model_Result.SetAndObservePolyData(glyph.GetOutput())
 
-            except:
+            else:
                 glyph = self.CreateGlyphs(polydata, True)
                 scalarRangeElevation = polydata.GetScalarRange()
 
@@ -1128,37 +1240,27 @@ class PCA_KinematicsWidget:
         # for each polydata in the polydata_list
         # Output the coefficients to a text file
 
-        # Import the linear algebra package from numpy (for distance measurement)
-        from numpy import linalg as LA
-
-        # Initilize the vtkFloatArray to hold the fitted parameters
-        fitted_params = vtk.vtkFloatArray()
-        fitted_params.SetNumberOfComponents(1)
-        fitted_params.SetNumberOfTuples(num_tuples)
+        # Stack the points of all the surfaces into a single array (one row of x, y, z coordinates for each surface)
+        surface_points = np.empty((len(polydata_list), len(self.Model_Mean)))
+        for i in range(0, len(polydata_list)):
+            surface_points[i] = vtk_to_numpy(polydata_list[i].GetPoints().GetData()).ravel()
 
-        # Initilize a Python list for the coefficients
-        coefficients = np.zeros(num_tuples)
+        # Find the best fitting scaling paramters for all the surfaces at once (same as GetShapeParameters() of the vtkPCAAnalysisFilter)
+        # The coefficient of the i-th eigenvector is v_i * (x - mean) / sqrt(eigenvalue_i)
+        # The cached eigenvectors are already scaled by sqrt(eigenvalue_i) so divide by the eigenvalue instead
+        num_modes = min(num_tuples, self.Model_Basis.shape[1])
+        surface_points -= self.Model_Mean
+        coefficients = surface_points.dot(self.Model_Basis[:,:num_modes]) / self.Model_Evals[:num_modes]
 
         for i in range(0, len(polydata_list)):
             print(' ')
-            print('Fitting polydata # ' + str(i))
-
-            # Find the best fitting scaling paramters
-            pca_model.GetShapeParameters(polydata_list[i], fitted_params, num_tuples)
-
             print('fitted_params for ' + self.files[i] + ': ')
-
-            new_coeff = vtk_to_numpy(fitted_params)
-            print(new_coeff)
-
-            # Add the new coefficients to the array of all the coefficients
-            coefficients = np.vstack((coefficients,new_coeff))
+            print(coefficients[i])
 
         # Save the coefficients for interpolating between them later on
+        # (and clear the polynomials fitted to the previous coefficients)
         self.fitted_coefficients = coefficients
-
-        # The first row is all zeros so just delete is
-        self.fitted_coefficients = np.delete(self.fitted_coefficients, [0],axis=0)           
+        self.Polyfit_Cache = None
 
         # Set the status bar to 100%
         self.progressBar.setValue(0)
@@ -1167,9 +1269,6 @@ class PCA_KinematicsWidget:
         self.progressBar.show() 
 
        
-        # Remove the first row of zeros (used to initilize the array)
-        coefficients = np.delete(coefficients, (0), axis=0)
-
         # Output the coefficients to a text file using numpy
         np.savetxt(os.path.join(self.fitting_output_directory_path, 'Fitted_Model_Coefficients.txt'), coefficients, delimiter=',',  fmt='%f')
 
@@ -1205,69 +1304,48 @@ class PCA_KinematicsWidget:
         # Initilize Python list to hold all of the polydata
         polydata_list = []
 
+        # Only use the STL and PLY files in the folder
         # List to keep track of all the useable files in the folder
         self.files = []
+        for filename in files:
+            if filename[-3:] == 'stl' or filename[-3:] == 'ply':
+                # Save the file name for later on 
+                self.files.append(filename)
+            else:
+                print('File type provided was ' + filename[-3:] + ' but only PLY and STL files are currently support. Skipping this file.')  
+
+        slicer.util.showStatusMessage("Loading STL Surfaces...")
 
-        # Variable to get the ploydata vtkMultiBlockDataSet order correct
-        iter = 0
+        # Load the surfaces in parallel (the vtk readers release the GIL while reading)
+        # map() returns the surfaces in the same order as the files
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count())
+        loaded_surfaces = executor.map(self.Load_Surface_File, [os.path.join(directory_path, filename) for filename in self.files])
 
         # Load each .stl file and add to the block set of the polydata
-        for i in range(0, len(files)):
+        for i, poly_data in enumerate(loaded_surfaces):
 
             # Update the status bar
-            self.progressBar.setValue(float(i)/len(files)*100) # Use 100% of the bar for this
+            self.progressBar.setValue(float(i)/len(self.files)*100) # Use 100% of the bar for this
             slicer.app.processEvents()
-            slicer.util.showStatusMessage("Loading STL Surfaces...")
 
-            filename = os.path.join(directory_path, files[i])         
-
-            if files[i][-3:] == 'stl':
-                # Save the file name for later on 
-                self.files.append(files[i])
+            # Save the loaded poly_data to the list
+            polydata_list.append(poly_data)
 
-                reader = vtk.vtkSTLReader()
-                reader.SetFileName(filename)
-                reader.Update()
-                poly_data = reader.GetOutput()
+            block_set.SetBlock(i, poly_data)
 
-                # Save the loaded poly_data to the list
-                polydata_list.append(poly_data)
-
-            elif files[i][-3:] == 'ply':
-                # Save the file name for later on 
-                self.files.append(files[i])
-
-                reader = vtk.vtkPLYReader()
-                reader.SetFileName(filename)
-                reader.Update()
-                poly_data = reader.GetOutput()
-
-                # Save the loaded poly_data to the list
-                polydata_list.append(poly_data)
-
-            else:
-                # Skip this iteration since the file is not a STL or a PLY file
-                continue
-                print('File type provided was ' + files[i][-3:] + ' but only PLY and STL files are currently support. Skipping this file.')  
-
-            block_set.SetBlock(iter, poly_data)
-            
-            # Add one to the iteration variable
-            iter = iter + 1
+        executor.shutdown()
 
         # Check to see if all the polydata have the same number of points
         # If they are not exactly the same, Slicer will just crash with no error message
         # which is difficult to debug
-        polydata_points = []
-        for i in range(0,len(polydata_list)):
-            points = polydata_list[i].GetPoints()
-            polydata_points.append(points.GetNumberOfPoints())
+        polydata_points = [poly_data.GetNumberOfPoints() for poly_data in polydata_list]
         
         # Now check to see if all the number of points are the same
-        # If it is not the same then the number of unique point numbers will not be 
-        # equal to one
-        if len(np.unique(np.asarray(polydata_points))) != 1:
-            # If the lengths are not the same raise an error and provide a suggested solution
+        # If it is not the same then the minimum and maximum number of points will be different
+        # (or there are no surfaces at all)
+        if len(polydata_points) == 0 or min(polydata_points) != max(polydata_points):
+            # If the lengths are not the same show an error and provide a suggested solution
+            # Return None so the caller doesn't use the surfaces
             msg = qt.QMessageBox()
             msg.setIcon(qt.QMessageBox.Information)
             msg.setText("The number of surface points (i.e. verticies) is not the same for all of the training data!")
@@ -1275,12 +1353,43 @@ class PCA_KinematicsWidget:
             msg.setWindowTitle("Create PCA Model - Error")
             msg.setDetailedText("The training data will need to be recreated or else remove the surfaces which have a different number of points."+
                             " \n \n You can check the number of points by loading the surfaces into Slicer and using the builtin Model module.")
-            msg.show()
+            msg.exec_()
 
-            raise ValueError("The number of surface points (i.e. verticies) is not the same for all of the training data!")
+            return None, None
 
         return polydata_list, block_set
 
+    def Get_Training_Data_Key(self, directory_path):
+        # Return the folder path with the name, modification time, and size of each surface file (PLY or STL) in it
+        # Used to check if the PCA model needs to be created again
+
+        surface_files = []
+
+        try:
+            with os.scandir(directory_path) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(('.stl', '.ply')):
+                        st = entry.stat()
+                        surface_files.append((entry.name, st.st_mtime, st.st_size))
+        except OSError:
+            return None
+
+        return (directory_path, sorted(surface_files))
+
+    def Load_Surface_File(self, filename):
+        # Load a single surface file (either PLY or STL)
+        # Runs in a worker thread so each call uses its own reader
+
+        if filename[-3:] == 'stl':
+            reader = vtk.vtkSTLReader()
+        else:
+            reader = vtk.vtkPLYReader()
+
+        reader.SetFileName(filename)
+        reader.Update()
+
+        return reader.GetOutput()
+
     def onPCAFittingButtonClicked(self):
         # Load the surfaces in the folder of surfaces in correspondence
         # Fit the PCA kinematic model to each surface by projecting the points onto the eigenvectors
@@ -1295,9 +1404,7 @@ class PCA_KinematicsWidget:
             msg.setText('A directory of surfaces for fitting was not provided.')
             msg.setInformativeText("Click on the Choose Input Folder to select the folder of surfaces for fitting.")
             msg.setWindowTitle("Wrist PCA-Kinematics - Error")
-            msg.show()
-
-            raise ValueError('A directory of surfaces for fitting was not provided.')
+            msg.exec_()
 
             return
 
@@ -1309,9 +1416,7 @@ class PCA_KinematicsWidget:
             msg.setText('A bone displacement model has not been created yet.')
             msg.setInformativeText("Click on the Create Bone Displacement Model button first to create the model.")
             msg.setWindowTitle("Wrist PCA-Kinematics - Error")
-            msg.show()
-
-            raise ValueError('A bone displacement model has not been created yet.')
+            msg.exec_()
 
             return
         
@@ -1323,9 +1428,7 @@ class PCA_KinematicsWidget:
             msg.setText('An output directory to save the text files to was not provided.')
             msg.setInformativeText("Click on the Choose Output Folder to select the folder to save to.")
             msg.setWindowTitle("Wrist PCA-Kinematics - Error")
-            msg.show()
-
-            raise ValueError('An output directory to save the text files to was not provided.')
+            msg.exec_()
 
             return
 
@@ -1335,17 +1438,36 @@ class PCA_KinematicsWidget:
         self.progressBar.show()
         slicer.app.processEvents()
         
-        # Load each STL file, process it, and save to a Python list (i.e. self.polydata_list)
+        # Load each STL file, process it, and save to a Python list (i.e. polydata_list)
         # The folder of the STL files to fit the model to is "self.Directory_Input_Surfaces_Fitting"
         # apply_tranform = False for now, but this might need to be True for later?
-        self.polydata_list, block_set = self.Load_Surface_From_Directory(self.Directory_Input_Surfaces_Fitting, apply_tranform=False)
+        polydata_list, block_set = self.Load_Surface_From_Directory(self.Directory_Input_Surfaces_Fitting, apply_tranform=False)
+
+        # The surfaces can't be fitted (the error was already shown) so stop here
+        if polydata_list is None:
+            self.progressBar.hide()
+            return
 
         # Fit the model to the polydata find the scaling parameters
-        self.Fit_Polydata(self.pca_model, self.polydata_list, self.num_tuples)
+        self.Fit_Polydata(self.pca_model, polydata_list, self.num_tuples)
 
         shape = self.fitted_coefficients.shape
 
     def onTimeSelectSlider_FittedChange(self):
+        # Save the current value of the slider
+        self.TimeSelected_Fitted = self.TimeSelectSlider_Fitted.value
+
+        # Update the model once the slider stops moving
+        self.Fitted_Timer.start()
+
+    def onTimeSelectSlider_FittedReleased(self):
+        # Show the full resolution model now that the time slider was released
+        self.Slider_Dragging = False
+
+        if self.pca_model != []:
+            self.Fitted_Timer.start()
+
+    def onFittedTimeout(self):
         # After fitting the model to the surfaces in the Run Fitting Procedure folder, 
         # interpolate between the found coefficients
 
@@ -1358,81 +1480,44 @@ class PCA_KinematicsWidget:
             msg.setText('A bone displacement model has not been created yet.')
             msg.setInformativeText("Click on the Create Bone Displacement Model button first to create the model.")
             msg.setWindowTitle("Wrist PCA-Kinematics - Error")
-            msg.show()
+            msg.exec_()
 
-            raise ValueError('A bone displacement model has not been created yet.')
-
-            return
-
-        
-        # Flag to check if onTimeSelectSlider_FittedChange() is already running
-        if self.Already_Running == True:
-            # onTimeSelectSlider_FittedChange() is already running so just return now
             return
-        else:
-            # If not already running (i.e. False) set the flag to true (i.e. is running)
-            self.Already_Running = True
-
-        # Save the current value of the slider
-        self.TimeSelected_Fitted = self.TimeSelectSlider_Fitted.value
 
         shape = self.fitted_coefficients.shape
 
-        # Fit a curve to each of eigenvalue list seperately
-        fitted_EV = []
-        for i in range(0,shape[1]):
+        # The fitted curves only depend on the fitting order and the fitted coefficients (not on the time point)
+        # So only fit them once and reuse them while the time slider is moved
+        if self.Polyfit_Cache is None:
+
+            # Fit a curve to each of eigenvalue list seperately
+            # chebfit() fits every column of the fitted coefficients in a single least squares solve
+            # Each column of the result has the polynomial coefficients for one eigenvalue
+            # The polynomials are the same as np.polyfit() but the Chebyshev basis is much better conditioned on [-1, 1] for higher orders
 
             # Equally space the x values to go from -1 to 1 with the number of fitted positions
             x = np.linspace(-1,1,shape[0])
-            y = self.fitted_coefficients[:,i]
-            z = np.polyfit(x,y,self.FittingOrder_Fitted) # self.FittingOrder_Fitted is 1 for linear, 2 for parabolic, etc.
-            p_fit = np.poly1d(z)
-
-            # Apply the model at the time point selected using the slider
-            fitted_EV.append(p_fit(self.TimeSelected_Fitted))
+            self.Polyfit_Cache = chebyshev.chebfit(x, self.fitted_coefficients, int(self.FittingOrder_Fitted)) # self.FittingOrder_Fitted is 1 for linear, 2 for parabolic, etc.
 
-        print('fitted_EV')
-        print(fitted_EV)
+        # Apply the model at the time point selected using the slider (all of the fitted curves at once)
+        fitted_EV = chebyshev.chebval(self.TimeSelected_Fitted, self.Polyfit_Cache)
 
         # Use the fitted eigenvalues to update the sliders and the model                
-        # Don't do the autorun if the sliders are resetting
-        self.reseting_state = True
-
-        # Reset all the sliders back to zero
-        self.FirstEVSlider.value  = fitted_EV[0]
-        self.SecondEVSlider.value = fitted_EV[1]
-        self.ThirdEVSlider.value  = fitted_EV[2]
-        self.FourthEVSlider.value = fitted_EV[3]
-        self.FifthEVSlider.value  = fitted_EV[4]
-
-        # Set the reseting flag back to false now (if needed)
-        self.reseting_state = False
-
-        # Show the model at the specified scaling parameters
-        params = vtk.vtkFloatArray()
-        params.SetNumberOfComponents(1)
-        params.SetNumberOfTuples(len(fitted_EV)) 
+        self.Set_Model_Coefficient_Sliders(fitted_EV)
 
-        for i in range(0,len(fitted_EV)):
-            params.SetTuple1(i,fitted_EV[i])
+        # If the time slider is being dragged only show the decimated preview of the model
+        # The full resolution model is shown once the slider is released
+        if self.Slider_Dragging and self.Preview_Shape is not None:
+            self.Show_Model_Preview(fitted_EV)
+            return
 
         self.progressBar.setValue(50) 
         slicer.app.processEvents()
-        slicer.util.showStatusMessage("Applying Model Coefficients...")
-
-        self.pca_model.GetParameterisedShape(params, self.output_shape)
-
-        # Update the status bar
-        # Start at 90%
-        self.progressBar.setValue(90)
-        slicer.app.processEvents()
         slicer.util.showStatusMessage("Outputting model...")
 
-        # Create model node ("Model_Result") and add to scene
-        self.Render_Surface(self.output_shape)
-
-        # Reset the already running flag back to false
-        self.Already_Running = False
+        # Show the model at the specified scaling parameters (using the cached eigenvectors)
+        # and create model node ("Model_Result") and add to scene
+        self.Show_Model_Instance(fitted_EV)
 
         return
 
@@ -1440,11 +1525,18 @@ class PCA_KinematicsWidget:
         # Save the current state of the slider
         self.FittingOrder_Fitted = newValue
 
+        # The curves need to be fitted again with the new order
+        self.Polyfit_Cache = None
+
     def onFitToImageClicked(self):
         # Fit the PCA model to some image by finding a set of new landmarks 
         # and then project these landmarks on to the eigenvectors in order to
         # update the PCA model coefficients
 
+        # SimpleITK is only imported when needed (it is slow to import and not needed to open the module)
+        import SimpleITK as sitk
+        import sitkUtils
+
         # Find the input image in Slicer and convert to a SimpleITK image type
         imageID = self.inputSelector.currentNode()
         image = sitkUtils.PullFromSlicer(imageID.GetName())
@@ -1489,211 +1581,64 @@ class PCA_KinematicsWidget:
             # Point normals
             normalsArray = polydata_Normals.GetPointData().GetNormals()
 
-            # Create a vtkPoints object which will hold the landmark points on the image for fitting the PCA model to
-            # Reset this each iteration of model fitting
-            landmarkPoints = vtk.vtkPoints()
-
-            # Create a vtkPoints object to hold all the points on the image sampled (for debugging)
-            sampledPoints = vtk.vtkPoints()
-
-            # Get the verticies and points from the input polydata
-            points = vtk.vtkPoints()
+            # Get the points and the normal vectors of the PCA model surface as numpy arrays (N x 3)
+            # Converting the whole arrays at once avoids looping over every point in Python
             points = currentPCASurface.GetPoints()
+            surface_points = vtk_to_numpy(points.GetData()).astype(np.float64)
+            surface_normals = vtk_to_numpy(normalsArray).astype(np.float64)
+
+            # Convert the points from physical to image units (same as image.TransformPhysicalPointToIndex() for each point)
+            # index = round(inverse(direction * spacing) * (point - origin))
+            direction = np.asarray(image.GetDirection()).reshape(3,3)
+            physical_to_index = np.linalg.inv(direction * np.asarray(spacing))
+            point_index = np.floor((surface_points - np.asarray(origin)).dot(physical_to_index.T) + 0.5)
+
+            # Convert the normal vectors from physical to image units
+            surface_normals = surface_normals / np.asarray(spacing)
+
+            # Equally spaced locations along the normal vector of each point (from -SearchDistance to +SearchDistance)
+            # pixelLocations has the shape (number of points, NumSamples, 3)
+            steps = np.linspace(-SearchDistance, SearchDistance, NumSamples)
+            pixelLocations = point_index[:,np.newaxis,:] + steps[np.newaxis,:,np.newaxis] * surface_normals[:,np.newaxis,:]
+
+            # Sample the image at all of these locations at once
+            # The numpy view of the image is indexed as (z, y, x)
+            # Locations outside of the image get an intensity of -10000
+            image_array = sitk.GetArrayViewFromImage(image)
+            pixel_index = np.trunc(pixelLocations).astype(np.int64)
+            inside = np.all((pixel_index >= 0) & (pixel_index < np.asarray(imgExtent)), axis=2)
+            pixel_index[~inside] = 0
+            pixelIntensities = np.where(inside, image_array[pixel_index[...,2], pixel_index[...,1], pixel_index[...,0]], -10000)
+
+            # Convert the sampled locations from image back to physical units
+            pixelLocations = pixelLocations * np.asarray(spacing) + np.asarray(origin)
+
+            # Add all the sampled points to the vtkPoints (for debugging)
+            sampledPoints = vtk.vtkPoints()
+            sampledPoints.SetData(numpy_to_vtk(pixelLocations.reshape(-1,3), deep=1))
 
-            # Iterate over the points on the PCA_Surface_Vector[model_ndx] vtkPolyData
-            for i in range(0, points.GetNumberOfPoints()):
-
-                # # Initilize a variable to hold the current point
-                # double p[3]
-
-                # # Initilize a variable to hold the normal vector
-                # double dataN[3]
-
-                # Get the current point on the PCA model surface
-                p = points.GetPoint(i)
-                p = list(p)   
-
-                # Get the normal vector at the current point on the PCA model surface
-                dataN = normalsArray.GetTuple(i)
-
-                # # Find a perpendicular vector for each of the normal vectors
-                # # This will allow us to sample not just in the normal direction, but perpendicular to it as well
-                # # Hopefully will make the fitting more robust
-                # # See: https:#www.vtk.org/Wiki/VTK/Examples/Cxx/Math/VectorDot
-                # # double cross_P[3]
-                # cross_P = [0, 0, 0]
-                # vect_B = [ 0, 1, 0 ]
-                # cross_P[0] = dataN[1] * vect_B[2] - dataN[2] * vect_B[1]
-                # cross_P[1] = dataN[0] * vect_B[2] - dataN[2] * vect_B[0]
-                # cross_P[2] = dataN[0] * vect_B[1] - dataN[1] * vect_B[0]
-                # Normalize this vector
-                #double len = std::sqrt(cross_P[0]*cross_P[0] + cross_P[1]*cross_P[1] + cross_P[2]*cross_P[2])
-                #cross_P[0] /= len
-                #cross_P[1] /= len
-                #cross_P[2] /= len
-
-                #cout << "cross_P: " << cross_P[0] << " " << cross_P[1] << " " << cross_P[2] << '\n'
-
-                # Convert the current point from physical back to image units
-                # print("p 1 = ")
-                # print(p)
-                
-                # print("p 2 = ")
-                # print(image.TransformPhysicalPointToIndex(p))
-
-                p = image.TransformPhysicalPointToIndex(p)
-
-                # p = [200, 200, 200]
-
-                # p[0] = (p[0] - origin[0]) / spacing[0]
-                # p[1] = (p[1] - origin[1]) / spacing[1]
-                # p[2] = (p[2] - origin[2]) / spacing[2]
-
-                # print("p 3 = ")
-                # print(p)
-
-                # # Sample the image at this point
-                # tempIntensity = image.GetPixel(p[0],p[1],p[2])
-                # print("tempIntensity = ")
-                # print(tempIntensity)
-
-                dataN = list(dataN)
-
-                # Convert the current normal vector from physical to image units
-                dataN[0] = dataN[0] / spacing[0]
-                dataN[1] = dataN[1] / spacing[1]
-                dataN[2] = dataN[2] / spacing[2]
-
-                # # Convert the current normal vector from physical to image units
-                # cross_P[0] = cross_P[0] / spacing[0]
-                # cross_P[1] = cross_P[1] / spacing[1]
-                # cross_P[2] = cross_P[2] / spacing[2]
-
-                # Variable to hold a vector of the pixel intensities
-                # To save the intensitiies along the normal vector, then pick one of them as a landmark
-                pixelIntensities = []
-
-                # Variables to hold a vector of the pixel locations sampled, then pick one of them as a landmark
-                # Vectors in c++ can't hold arrays so need to use three separate ones
-                pixelLocations_X = []
-                pixelLocations_Y = []
-                pixelLocations_Z = []
-
-                # Create three temporary vectors
-                pixelLocations_X_temp = []
-                pixelLocations_Y_temp = []
-                pixelLocations_Z_temp = []
-
-                first_point  = [0,0,0]
-                second_point = [0,0,0]
-
-                # The two points found by the current surface vertice (i.e. p) and the current normal vector (i.e. dataN)
-                for k in range(0,3):
-                    first_point[k] = p[k] - SearchDistance / 1 * dataN[k] # -SearchDistance / 10 *z / 10 * cross_P[k]
-                    second_point[k] = p[k] + SearchDistance / 1 * dataN[k] # +SearchDistance / 10 *z / 10 * cross_P[k]            
-
-                # Use the linspace function to find equally spaced values
-                pixelLocations_X_temp = np.linspace(first_point[0], second_point[0], NumSamples)
-                pixelLocations_Y_temp = np.linspace(first_point[1], second_point[1], NumSamples)
-                pixelLocations_Z_temp = np.linspace(first_point[2], second_point[2], NumSamples)
-
-                # Add the newly found locations to the previous vector for X, Y, and Z
-                for i in range(0, len(pixelLocations_X_temp)):
-                    p = [pixelLocations_X_temp[i], pixelLocations_Y_temp[i], pixelLocations_Z_temp[i]]
-                    # p = image.TransformPhysicalPointToIndex(p)
-
-                    pixelLocations_X.append(p[0])
-                    pixelLocations_Y.append(p[1])
-                    pixelLocations_Z.append(p[2])
-
-                    
-
-                # Loop through the pixel locations and sample the image at these locations
-                for z in range(0, len(pixelLocations_X)):
-
-                    # double pixelNewPoint
-                    
-                    # # Check to make sure the point is within the image extent
-                    # if (pixelLocations_X[z] <= imgExtent[0] or pixelLocations_X[0] >= imgExtent[1] or
-                    #     pixelLocations_Y[z] <= imgExtent[2] or pixelLocations_Y[z] >= imgExtent[3] or
-                    #     pixelLocations_Z[z] <= imgExtent[4] or pixelLocations_Z[z] >= imgExtent[5]):
-                    #         #  or std::isnan(pixelLocations_X[0]) or std::isnan(pixelLocations_X[1]) or std::isnan(pixelLocations_X[2])
-                    #     # Pixel is outside the image extent so just use NaN for its intensity
-                    #     pixelNewPoint = -1
-                    # else:
-
-                    # Sample the image at this point
-                    #image.GetPixel(p[0],p[1],p[2]
-                    try:
-                        pixelNewPoint = image.GetPixel(int(pixelLocations_X[z]), int(pixelLocations_Y[z]), int(pixelLocations_Z[z]))
-                    except:
-                        pixelNewPoint = -10000
-
-
-                    # Add this image intensity value to the vector of intensities
-                    pixelIntensities.append(pixelNewPoint)
-
-
-
-                # print("pixelIntensities")
-                # print(pixelIntensities)
-
-                # Convert the current points from image back to physical units
-                for z in range(0, len(pixelLocations_X)):
-
-                    pixelLocations_X[z] = pixelLocations_X[z] * spacing[0] + origin[0]
-                    pixelLocations_Y[z] = pixelLocations_Y[z] * spacing[1] + origin[1]
-                    pixelLocations_Z[z] = pixelLocations_Z[z] * spacing[2] + origin[2]
-
-                    p = [pixelLocations_X[z], pixelLocations_Y[z], pixelLocations_Z[z]]
-                    #p = image.TransformPhysicalPointToIndex(p)
-
-
-                    # Only need to save the sampled points if it is the last iteration of the fitting (i.e. only last iteration is rendered)
-                    #if save_sampled_points == True:
-                    # Add the current sampled point to the vtkPoints (for debugging)
-                    sampledPoints.InsertNextPoint(p[0], p[1], p[2])
-
-
-                ndx = np.amax(pixelIntensities)
-
-
-                
-                # int ndx
-                # # SearchType 0 is use maximum intensity along the sampled vector
-                # if (SearchType == 0) {
-                #     ndx = max_element(pixelIntensities.begin(), pixelIntensities.end()) - pixelIntensities.begin()
-                # }
-                # # SearchType 1 is use minimum intensity along the sampled vector
-                # else if (SearchType == 1) {
-                #     ndx = min_element(pixelIntensities.begin(), pixelIntensities.end()) - pixelIntensities.begin()
-                # }
-
-                # # Find the maximum value, the minimum value, and then find the ndx halfway between them
-                # SearchType = 3
-                # if (SearchType == 3):
-
-                #     # Array to hold the temp vector
-                #     temp_vec = []
-
-                #     # Find the difference between each element (i.e. the derivative)
-                #     for i in range(0, len(pixelIntensities) - 1):
-                #         temp_vec.append(pixelIntensities[i + 1] - pixelIntensities[i])
-                    
-                #     # Choose the largest difference (i.e. the largest gradient)
-                #     ndx = np.amax(temp_vec)
-
-                # Use the found minimum pixel location to save the x, y, and z coordinates
-                try:
-                    bestPoint = [0,0,0]
-                    bestPoint[0] = pixelLocations_X[ndx]
-                    bestPoint[1] = pixelLocations_Y[ndx]
-                    bestPoint[2] = pixelLocations_Z[ndx]
-                except:
-                    bestPoint = points.GetPoint(i)
+            # Index of the sample with the maximum intensity along the normal vector of each point
+            ndx = np.argmax(pixelIntensities, axis=1)
+            
+            # int ndx
+            # # SearchType 0 is use maximum intensity along the sampled vector
+            # if (SearchType == 0) {
+            #     ndx = max_element(pixelIntensities.begin(), pixelIntensities.end()) - pixelIntensities.begin()
+            # }
+            # # SearchType 1 is use minimum intensity along the sampled vector
+            # else if (SearchType == 1) {
+            #     ndx = min_element(pixelIntensities.begin(), pixelIntensities.end()) - pixelIntensities.begin()
+            # }
+
+            # Use the found pixel location to save the x, y, and z coordinates
+            # If none of the samples along the normal vector are inside the image use the current point on the surface instead
+            valid_ndx = inside[np.arange(len(ndx)), ndx]
+            bestPoints = np.where(valid_ndx[:,np.newaxis], pixelLocations[np.arange(len(ndx)), ndx], surface_points)
 
-                # Add the best found point to the vtkPoints holding the landmark points
-                landmarkPoints.InsertNextPoint(bestPoint)
+            # Create a vtkPoints object which will hold the landmark points on the image for fitting the PCA model to
+            # Reset this each iteration of model fitting
+            landmarkPoints = vtk.vtkPoints()
+            landmarkPoints.SetData(numpy_to_vtk(bestPoints, deep=1))
 
             # Set the points and vertices as the geometry and topology of the polydata
             polydataLandmarks = vtk.vtkPolyData()
@@ -1782,17 +1727,8 @@ class PCA_KinematicsWidget:
             print(new_coeff)
 
             # Set the new model coefficients
-            self.FirstEV = new_coeff[0]
-            self.SecondEV = new_coeff[1]
-            self.ThirdEV = new_coeff[2]
-            self.FourthEV = new_coeff[3]
-            self.FifthEV = new_coeff[4]
-
-            self.FirstEVSlider.value  = new_coeff[0]
-            self.SecondEVSlider.value = new_coeff[1]
-            self.ThirdEVSlider.value  = new_coeff[2]
-            self.FourthEVSlider.value = new_coeff[3]
-            self.FifthEVSlider.value  = new_coeff[4]
+            # The model is updated below (instead of once for each slider)
+            self.Set_Model_Coefficient_Sliders(new_coeff)
 
             # Update the rendering in 3D Slicer
             self.onCompute()